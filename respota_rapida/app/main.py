@@ -1,8 +1,21 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from app.database import init_db
-from app.routers import connect, question, tournament, ranking  # importa os routers
+from app.routers import connect, question, tournament, ranking, metrics, players  # importa os routers
+from app.services.answer_log import iniciar_answer_log, parar_answer_log
+from app.services.question_buffer import aquecer_pools
+from app.services.question_cache import orjson
+from app.services.player_stats import criar_tabelas as criar_tabelas_estatisticas
+from app.services.question_calibration import iniciar_calibracao
+from app.services.timing_service import criar_tabelas as criar_tabelas_tempo
+from app.services.tournament_service import criar_tabelas as criar_tabelas_torneio
 
-app = FastAPI(title="Resposta Rápida", version="1.0.0")
+# Usa orjson para serializar as respostas quando estiver instalado
+app = FastAPI(
+    title="Resposta Rápida",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
+)
 
 
 # Inicializa o banco de dados
@@ -13,6 +26,23 @@ app.include_router(connect.router, prefix="/api", tags=["Jogadores"])
 app.include_router(question.router, prefix="/api", tags=["Perguntas"])
 app.include_router(tournament.router, prefix="/api", tags=["Torneio"])
 app.include_router(ranking.router, prefix="/api", tags=["Ranking"])
+app.include_router(players.router, prefix="/api", tags=["Jogadores"])
+app.include_router(metrics.router, prefix="/api", tags=["Métricas"])
+
+# Pré-enche os pools de perguntas, inicia a calibração de dificuldade
+# e recupera respostas do log write-behind que não chegaram ao banco
+@app.on_event("startup")
+def iniciar_servicos_background():
+    criar_tabelas_estatisticas()
+    criar_tabelas_torneio()
+    criar_tabelas_tempo()
+    iniciar_answer_log()
+    aquecer_pools()
+    iniciar_calibracao()
+
+@app.on_event("shutdown")
+def parar_servicos_background():
+    parar_answer_log()
 
 # Rota raiz
 @app.get("/")
@@ -4,7 +4,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from ..config import SessionLocal
-from ..models import User, Match, MatchPlayer
+from ..models import User, Match, MatchPlayer, TournamentMatch
+from ..services.state_backend import get_backend
+
+# Fila compartilhada de partidas aguardando adversário
+FILA_ESPERA = "matchmaking:waiting"
 
 router = APIRouter()
 
@@ -27,11 +31,14 @@ def get_or_create_user(db: Session, username: str):
     db.refresh(user)
     return user
 
-# Busca uma partida que tenha apenas um jogador
+# Busca uma partida que tenha apenas um jogador.
+# Partidas de torneio ficam de fora: um bye do suíço também tem um só jogador.
 def find_waiting_match(db: Session):
     return (
         db.query(MatchPlayer.match_id)
         .join(Match, Match.id == MatchPlayer.match_id)
+        .outerjoin(TournamentMatch, TournamentMatch.match_id == MatchPlayer.match_id)
+        .filter(TournamentMatch.id.is_(None))
         .group_by(MatchPlayer.match_id)
         .having(func.count(MatchPlayer.user_id) == 1)
         .first()
@@ -46,11 +53,17 @@ def connect_player(username: str, db: Session = Depends(get_db)):
     # Obtém ou cria usuário
     user = get_or_create_user(db, username)
 
-    # Verifica se existe partida aguardando adversário
-    waiting = find_waiting_match(db)
+    backend = get_backend()
+    if backend.compartilhado:
+        # Retira atomicamente uma partida aguardando adversário (válido entre workers/nós)
+        waiting_match_id = backend.sair_fila(FILA_ESPERA)
+    else:
+        # Sem backend compartilhado o MySQL continua sendo o ponto de encontro entre workers
+        waiting = find_waiting_match(db)
+        waiting_match_id = waiting.match_id if waiting else None
 
-    if waiting:
-        match_id = waiting.match_id
+    if waiting_match_id:
+        match_id = int(waiting_match_id)
         status_msg = "Partida pronta para iniciar"
     else:
         # Cria nova partida
@@ -64,9 +77,22 @@ def connect_player(username: str, db: Session = Depends(get_db)):
     # Registra jogador na partida
     match_player = MatchPlayer(match_id=match_id, user_id=user.id)
     db.add(match_player)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        # A partida retirada da fila continua sem adversário: volta para o início da fila
+        if waiting_match_id and backend.compartilhado:
+            backend.devolver_fila(FILA_ESPERA, str(waiting_match_id))
+        raise
     db.refresh(match_player)
 
+    # Só entra na fila depois do jogador gravado, para o adversário encontrar a partida completa
+    if waiting_match_id:
+        backend.publicar(f"match:{match_id}", '{"evento": "pronta"}')
+    elif backend.compartilhado:
+        backend.entrar_fila(FILA_ESPERA, str(match_id))
+
     return {
         "message": "Jogador conectado com sucesso.",
         "user_id": user.id,
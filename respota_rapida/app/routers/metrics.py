@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from app.services.metrics import snapshot
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics():
+    # Métricas do processo atual (cada worker expõe as suas)
+    return snapshot()
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.config import SessionLocal
+from app.models import User
+from app.services.player_stats import obter_estatisticas
+
+router = APIRouter()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@router.get("/players/{user_id}/stats")
+def get_player_stats(user_id: int, db: Session = Depends(get_db)):
+    # Lê da tabela materializada player_stats, sem varrer o histórico de respostas
+    user = db.query(User).get(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    stats = obter_estatisticas(db, user_id)
+    stats["username"] = user.username
+    return stats
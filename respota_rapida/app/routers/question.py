@@ -1,66 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from collections import Counter
 import json
 
 from app.config import get_db
-from app.models import Question, MatchQuestion
-from app.services.openai_service import gerar_pergunta
+from app.services.admission import admissao, permitir_prefetch
+from app.models import Question, MatchQuestion, MatchPlayer
+from app.services.answer_log import answer_log
+from app.services.openai_service import DIFICULDADES
+from app.services.player_stats import partidas_encerradas, registrar_partida, registrar_respostas
+from app.services.question_buffer import CATEGORIAS, categoria_permitida, reservar_pergunta, retirar_do_pool
+from app.services.question_calibration import registrar_perfil
+from app.services.question_cache import anexar_campos, incorporar, serializar_question_db
+from app.services.state_backend import chave_resposta, get_backend
+from app.services.timing_service import (
+    LIMITE_TEMPO_MAXIMO, definir_limite_partida, emitir_token, limite_para, marcar_envio, medir_tempo
+)
 
 router = APIRouter()
 
-# ------------------------------
-# 1. Gerar nova pergunta
-# ------------------------------
-@router.get("/question")
-def get_next_question(match_id: int, user_id: int, db: Session = Depends(get_db)):
+LIMITE_PERGUNTAS = 10
+
+def contar_respostas(db: Session, match_id: int, user_id: int) -> int:
     """
-    Gera uma nova pergunta via API do ChatGPT, salva no banco e vincula à partida.
-    Limita a 10 perguntas normais respondidas por jogador na partida.
+    Conta quantas perguntas normais o jogador já respondeu na partida.
     """
-    respostas_usuario = db.query(MatchQuestion).filter_by(
+    return db.query(MatchQuestion).filter_by(
         match_id=match_id,
         answered_by_user_id=user_id,
         is_extra_round=False
     ).count()
 
-    if respostas_usuario >= 10:
-        return {"message": "Você já respondeu 10 perguntas nesta partida."}
+def validar_dificuldade(dificuldade: Optional[str]):
+    if dificuldade is not None and dificuldade not in DIFICULDADES:
+        raise HTTPException(status_code=400, detail=f"Dificuldade inválida. Use: {', '.join(DIFICULDADES)}")
 
-    pergunta = gerar_pergunta()
-    if not pergunta:
-        raise HTTPException(status_code=500, detail="Erro ao gerar pergunta")
+def validar_categoria(categoria: Optional[str]):
+    if not categoria_permitida(categoria):
+        raise HTTPException(status_code=400, detail=f"Categoria inválida. Use: {', '.join(sorted(CATEGORIAS)) or 'nenhuma'}")
 
-    # Salva pergunta
-    question_db = Question(
-        question_text=pergunta["question"],
-        options=json.dumps(pergunta["options"]),
-        correct_option=pergunta["correct_option"],
-        tip=pergunta["tip"]
-    )
-    db.add(question_db)
-    db.commit()
-    db.refresh(question_db)
+def criar_pergunta_partida(db: Session, match_id: int, pergunta: dict, is_extra_round: bool = False):
+    """
+    Salva a pergunta e cria o vínculo com a partida, ainda sem sent_at.
+    Quem chama define sent_at no momento da entrega e faz o commit.
+    Perguntas vindas do fallback (com "id") reaproveitam a linha existente.
+    """
+    if pergunta.get("id"):
+        question_db = db.query(Question).get(pergunta["id"])
+    else:
+        question_db = Question(
+            question_text=pergunta["question"],
+            options=json.dumps(pergunta["options"]),
+            correct_option=pergunta["correct_option"],
+            tip=pergunta["tip"]
+        )
+        db.add(question_db)
+        db.flush()  # garante o id sem fechar a transação
+        registrar_perfil(db, question_db.id, pergunta.get("category"), pergunta.get("difficulty"))
 
-    # Vincula pergunta à partida com timestamp de envio
     match_question = MatchQuestion(
         match_id=match_id,
         question_id=question_db.id,
         answered_by_user_id=None,  # Ainda não respondida
-        sent_at=datetime.utcnow(),  # Timestamp do envio
-        is_extra_round=False
+        sent_at=None,
+        is_extra_round=is_extra_round
     )
     db.add(match_question)
+    db.flush()  # visível para o fallback excluir a pergunta na próxima reserva da mesma partida
+    return question_db, match_question
+
+# ------------------------------
+# 1. Gerar nova pergunta
+# ------------------------------
+@router.get("/question", dependencies=[Depends(admissao("question"))])
+def get_next_question(
+    match_id: int,
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    categoria: Optional[str] = None,
+    dificuldade: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Entrega uma nova pergunta (do pool da categoria/dificuldade ou gerada via API do ChatGPT),
+    salva no banco e vincula à partida.
+    Limita a 10 perguntas normais respondidas por jogador na partida.
+    O token de resposta vai no header X-Answer-Token.
+    """
+    validar_categoria(categoria)
+    validar_dificuldade(dificuldade)
+
+    if contar_respostas(db, match_id, user_id) >= LIMITE_PERGUNTAS:
+        return {"message": "Você já respondeu 10 perguntas nesta partida."}
+
+    pergunta = reservar_pergunta(db, categoria, dificuldade, match_id)
+    if not pergunta:
+        raise HTTPException(status_code=500, detail="Erro ao gerar pergunta")
+
+    question_db, match_question = criar_pergunta_partida(db, match_id, pergunta)
+
+    # Timestamp do envio registrado o mais perto possível da entrega
+    match_question.sent_at = datetime.utcnow()
     db.commit()
 
-    return {
-        "question_id": question_db.id,
-        "question": question_db.question_text,
-        "options": json.loads(question_db.options),
-        "tip": question_db.tip
-    }
+    # Payload serializado uma vez e reaproveitado por question_id
+    payload = serializar_question_db(question_db, pergunta.get("options"))
+
+    # O prazo começa na entrega: token emitido agora, relógio monotônico após o envio
+    token = emitir_token(match_id, question_db.id, limite_para(match_id, db=db))
+    background_tasks.add_task(marcar_envio, match_id, question_db.id)
+    return Response(content=payload, media_type="application/json", headers={"X-Answer-Token": token})
 
 # ------------------------------
 # 2. Responder pergunta
@@ -71,17 +123,29 @@ class AnswerRequest(BaseModel):
     user_id: int
     selected_option: str
     # time_taken será calculado com base no tempo de envio
+    prefetch_next: bool = False  # devolve a próxima pergunta junto com a correção
+    answer_token: Optional[str] = None  # token recebido junto com a pergunta
+    categoria: Optional[str] = None  # tema da próxima pergunta no modo pipeline
+    dificuldade: Optional[str] = None
 
 @router.post("/answer")
-def submit_answer(answer: AnswerRequest, db: Session = Depends(get_db)):
+def submit_answer(
+    answer: AnswerRequest,
+    background_tasks: BackgroundTasks,
+    x_answer_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """
-    Recebe a resposta de um usuário a uma pergunta específica,
+    Recebe a resposta de um usuário a uma pergunta específica (normal ou da rodada extra),
     valida se está no tempo limite e se a pergunta ainda não foi respondida.
     """
+    # Valida o pedido de prefetch antes de gravar qualquer coisa
+    validar_categoria(answer.categoria)
+    validar_dificuldade(answer.dificuldade)
+
     match_question = db.query(MatchQuestion).filter_by(
         match_id=answer.match_id,
-        question_id=answer.question_id,
-        is_extra_round=False
+        question_id=answer.question_id
     ).first()
 
     if not match_question:
@@ -90,11 +154,18 @@ def submit_answer(answer: AnswerRequest, db: Session = Depends(get_db)):
     if match_question.answered_by_user_id is not None:
         raise HTTPException(status_code=400, detail="Pergunta já respondida")
 
-    # Calcular tempo decorrido desde envio
-    tempo_agora = datetime.utcnow()
-    if not match_question.sent_at:
-        raise HTTPException(status_code=500, detail="Timestamp de envio da pergunta não definido")
-    tempo_decorrido = (tempo_agora - match_question.sent_at).total_seconds()
+    # Calcular tempo decorrido desde a entrega (monotônico, token assinado ou sent_at)
+    try:
+        tempo_decorrido, limite_tempo, _ = medir_tempo(
+            answer.match_id,
+            answer.question_id,
+            token=answer.answer_token or x_answer_token,
+            sent_at=match_question.sent_at,
+            is_extra_round=match_question.is_extra_round,
+            db=db
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Buscar pergunta para validação da resposta correta
     question = db.query(Question).get(answer.question_id)
@@ -103,34 +174,90 @@ def submit_answer(answer: AnswerRequest, db: Session = Depends(get_db)):
 
     acertou = answer.selected_option.strip().upper() == question.correct_option.strip().upper()
 
-    # Se tempo maior que 10 segundos, resposta considerada errada
-    if tempo_decorrido > 10:
+    # Se tempo maior que o limite da partida/rodada, resposta considerada errada
+    if tempo_decorrido > limite_tempo:
         acertou = False
 
-    # Atualiza registro da resposta
-    match_question.answered_by_user_id = answer.user_id
-    match_question.selected_option = answer.selected_option
-    match_question.time_taken = tempo_decorrido
-    match_question.is_correct = acertou
+    # Marca a resposta no backend compartilhado: só o primeiro worker/jogador grava
+    backend = get_backend()
+    chave = chave_resposta(answer.match_id, answer.question_id)
+    if not backend.marcar(chave, str(answer.user_id)):
+        raise HTTPException(status_code=400, detail="Pergunta já respondida")
 
-    db.commit()
+    try:
+        if answer_log is not None:
+            # Write-behind: grava no log local (fsync em grupo); o banco recebe em lote
+            answer_log.registrar({
+                "match_id": answer.match_id,
+                "question_id": answer.question_id,
+                "user_id": answer.user_id,
+                "selected_option": answer.selected_option,
+                "time_taken": tempo_decorrido,
+                "is_correct": acertou,
+                "is_extra_round": match_question.is_extra_round
+            })
+        else:
+            # Atualiza registro da resposta
+            match_question.answered_by_user_id = answer.user_id
+            match_question.selected_option = answer.selected_option
+            match_question.time_taken = tempo_decorrido
+            match_question.is_correct = acertou
+            registrar_respostas(db, [{"user_id": answer.user_id, "is_correct": acertou, "time_taken": tempo_decorrido}])
+            db.commit()
+    except Exception:
+        backend.apagar(chave)
+        raise
 
-    return {
+    backend.publicar(f"match:{answer.match_id}", json.dumps({
+        "evento": "resposta",
+        "question_id": answer.question_id,
+        "user_id": answer.user_id,
+        "correct": acertou
+    }))
+
+    resultado = {
         "correct_option": question.correct_option,
         "correct": acertou,
         "time_taken_seconds": round(tempo_decorrido, 2),
-        "message": "Tempo esgotado! Resposta considerada incorreta." if tempo_decorrido > 10 else "Resposta registrada com sucesso."
+        "message": "Tempo esgotado! Resposta considerada incorreta." if tempo_decorrido > limite_tempo else "Resposta registrada com sucesso."
     }
 
+    # Modo pipeline: já entrega a próxima pergunta, poupando um GET /question.
+    # Só usa o pool pronto; se estiver vazio ou o usuário passou do limite,
+    # next_question fica de fora e o cliente faz o GET (que passa pela admissão)
+    if (answer.prefetch_next and not match_question.is_extra_round
+            and contar_respostas(db, answer.match_id, answer.user_id) < LIMITE_PERGUNTAS
+            and permitir_prefetch(answer.user_id)):
+        pergunta = retirar_do_pool(answer.categoria, answer.dificuldade)
+        if pergunta:
+            proxima_db, proxima_match_question = criar_pergunta_partida(db, answer.match_id, pergunta)
+            proxima_match_question.sent_at = datetime.utcnow()
+            db.commit()
+            background_tasks.add_task(marcar_envio, answer.match_id, proxima_db.id)
+            proxima = anexar_campos(
+                serializar_question_db(proxima_db, pergunta.get("options")),
+                {"answer_token": emitir_token(answer.match_id, proxima_db.id, limite_para(answer.match_id, db=db))}
+            )
+            return Response(
+                content=incorporar(resultado, {"next_question": proxima}),
+                media_type="application/json"
+            )
+
+    return resultado
+
 # ------------------------------
 # 3. Ver resultado da partida
 # ------------------------------
-@router.get("/result")
-def get_result(match_id: int, db: Session = Depends(get_db)):
+@router.get("/result", dependencies=[Depends(admissao("result"))])
+def get_result(match_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Retorna as pontuações dos jogadores na partida.
     Se houver empate, cria rodada extra com 5 perguntas para cada empatado.
     """
+    # No modo write-behind, garante que as respostas pendentes já estão no banco
+    if answer_log is not None:
+        answer_log.descarregar()
+
     respostas = db.query(MatchQuestion).filter(
         MatchQuestion.match_id == match_id,
         MatchQuestion.is_extra_round == False,
@@ -155,6 +282,15 @@ def get_result(match_id: int, db: Session = Depends(get_db)):
 
     # Se não há empate, retorna resultado final
     if len(vencedores) == 1:
+        # Só conta a partida quando todos os jogadores dela responderam tudo (como na reconstrução)
+        jogadores = [uid for (uid,) in db.query(MatchPlayer.user_id).filter(MatchPlayer.match_id == match_id)]
+        respondidas = Counter(r.answered_by_user_id for r in respostas)
+        encerradas = partidas_encerradas(
+            [(match_id, uid, pontuacao.get(uid, 0), respondidas[uid]) for uid in jogadores]
+        )
+        if match_id in encerradas:
+            registrar_partida(db, match_id, encerradas[match_id])
+            db.commit()
         return {
             "pontuacoes": pontuacao,
             "empate": False,
@@ -163,43 +299,53 @@ def get_result(match_id: int, db: Session = Depends(get_db)):
 
     # Empate: criar rodada extra com 5 perguntas para cada empatado
     perguntas_extra = []
+    limite_extra = limite_para(match_id, is_extra_round=True, db=db)
     for user_id in vencedores:
         for _ in range(5):
-            pergunta = gerar_pergunta()
+            pergunta = reservar_pergunta(db, match_id=match_id)
             if not pergunta:
                 continue
 
-            question_db = Question(
-                question_text=pergunta["question"],
-                options=json.dumps(pergunta["options"]),
-                correct_option=pergunta["correct_option"],
-                tip=pergunta["tip"]
-            )
-            db.add(question_db)
-            db.commit()
-            db.refresh(question_db)
-
-            match_question = MatchQuestion(
-                match_id=match_id,
-                question_id=question_db.id,
-                answered_by_user_id=None,
-                sent_at=datetime.utcnow(),
-                is_extra_round=True
-            )
-            db.add(match_question)
-            perguntas_extra.append({
-                "user_id": user_id,
-                "question_id": question_db.id,
-                "question": question_db.question_text,
-                "options": json.loads(question_db.options),
-                "tip": question_db.tip
-            })
+            question_db, match_question = criar_pergunta_partida(db, match_id, pergunta, is_extra_round=True)
+            match_question.sent_at = datetime.utcnow()
+            perguntas_extra.append(anexar_campos(
+                serializar_question_db(question_db, pergunta.get("options")),
+                {"user_id": user_id, "answer_token": emitir_token(match_id, question_db.id, limite_extra)}
+            ))
+            background_tasks.add_task(marcar_envio, match_id, question_db.id)
     db.commit()
 
+    # Perguntas extras vão como bytes já serializados, sem decodificar options de novo
+    return Response(
+        content=incorporar({
+            "pontuacoes": pontuacao,
+            "empate": True,
+            "vencedores": vencedores,
+            "mensagem": "Empate detectado. Rodada extra com 5 perguntas criada para os jogadores empatados."
+        }, {"perguntas_extra": b"[" + b",".join(perguntas_extra) + b"]"}),
+        media_type="application/json"
+    )
+
+# ------------------------------
+# 4. Configurar limite de tempo da partida
+# ------------------------------
+class TimeLimitRequest(BaseModel):
+    limit_seconds: Optional[float] = None  # nulo volta ao padrão do servidor
+    extra_round_limit_seconds: Optional[float] = None
+
+@router.put("/match/{match_id}/time-limit")
+def set_time_limit(match_id: int, limites: TimeLimitRequest, db: Session = Depends(get_db)):
+    """
+    Define o limite de tempo por pergunta da partida e da rodada extra.
+    Vale para as perguntas entregues a partir de agora, em qualquer worker.
+    """
+    for valor in (limites.limit_seconds, limites.extra_round_limit_seconds):
+        if valor is not None and not 1 <= valor <= LIMITE_TEMPO_MAXIMO:
+            raise HTTPException(status_code=400, detail=f"Limite deve estar entre 1 e {LIMITE_TEMPO_MAXIMO} segundos")
+
+    definir_limite_partida(db, match_id, limites.limit_seconds, limites.extra_round_limit_seconds)
     return {
-        "pontuacoes": pontuacao,
-        "empate": True,
-        "vencedores": vencedores,
-        "mensagem": "Empate detectado. Rodada extra com 5 perguntas criada para os jogadores empatados.",
-        "perguntas_extra": perguntas_extra  # Pode ser útil para enviar perguntas extras aos usuários empatados
+        "match_id": match_id,
+        "limit_seconds": limite_para(match_id),
+        "extra_round_limit_seconds": limite_para(match_id, is_extra_round=True)
     }
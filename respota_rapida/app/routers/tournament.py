@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app.config import SessionLocal
 from app.models import Tournament, TournamentMatch, User, Match, MatchPlayer
+from app.services.player_stats import registrar_vitoria_torneio
+from app.services.tournament_service import FORMATOS, TOURNAMENT_MAX_PLAYERS, avancar_chave, exportar_chave, inscrever, transmitir_partidas
 from datetime import datetime
-import random
+from typing import Optional
 
 router = APIRouter()
 
@@ -18,105 +21,97 @@ def get_db():
     finally:
         db.close()
 
-# ────────────────────────────────
-# VALIDAÇÃO DE POTÊNCIA DE 2
-# ────────────────────────────────
-def is_power_of_two(n: int) -> bool:
-    return (n & (n - 1) == 0) and n != 0
-
-# ────────────────────────────────
-# FUNÇÃO: MONTAR CHAVES INICIAIS
-# ────────────────────────────────
-def montar_chaves(db: Session, tournament: Tournament, inscritos: list[int], minimo_jogadores: int):
-    random.shuffle(inscritos)
-
-    for i in range(0, minimo_jogadores, 2):
-        user1_id = inscritos[i]
-        user2_id = inscritos[i + 1]
-
-        match = Match()
-        db.add(match)
-        db.commit()
-        db.refresh(match)
-
-        mp1 = MatchPlayer(match_id=match.id, user_id=user1_id, status="playing")
-        mp2 = MatchPlayer(match_id=match.id, user_id=user2_id, status="playing")
-        db.add_all([mp1, mp2])
-
-        tournament_match = TournamentMatch(
-            tournament_id=tournament.id,
-            match_id=match.id,
-            round_number=1,
-            player1_id=user1_id,
-            player2_id=user2_id
-        )
-        db.add(tournament_match)
-
-    db.commit()
-
 # ────────────────────────────────
 # ROTA: ENTRAR NO TORNEIO
 # ────────────────────────────────
 @router.post("/tournament/join")
-def join_tournament(user_id: int, db: Session = Depends(get_db), minimo_jogadores: int = 4):
-    if not is_power_of_two(minimo_jogadores):
-        raise HTTPException(status_code=400, detail="Número de jogadores deve ser potência de 2 (ex: 4, 8, 16...)")
-
-    tournament = db.query(Tournament).filter(Tournament.status == "esperando").first()
-    if not tournament:
-        tournament = Tournament(status="esperando", tipo="eliminatorio")
-        db.add(tournament)
-        db.commit()
-        db.refresh(tournament)
-
-    inscritos = []
-    for match in tournament.matches:
-        if match.player1_id:
-            inscritos.append(match.player1_id)
-        if match.player2_id:
-            inscritos.append(match.player2_id)
-
-    if user_id in inscritos:
-        raise HTTPException(status_code=400, detail="Usuário já inscrito no torneio")
-
-    inscritos.append(user_id)
-
-    if len(inscritos) < minimo_jogadores:
-        return {"message": f"Inscrito no torneio. Aguardando mais jogadores. {len(inscritos)}/{minimo_jogadores}"}
+def join_tournament(
+    user_id: int,
+    db: Session = Depends(get_db),
+    minimo_jogadores: int = 4,
+    tournament_id: Optional[int] = None,
+    tipo: str = "eliminatorio"
+):
+    """
+    Inscreve o jogador em um torneio específico ou no primeiro aberto com o mesmo
+    formato e tamanho. Qualquer número de jogadores (de 2 a TOURNAMENT_MAX_PLAYERS):
+    vagas que faltam para a potência de 2 viram byes para os melhores seeds.
+    Os seeds usam o rating calculado no servidor.
+    """
+    if not 2 <= minimo_jogadores <= TOURNAMENT_MAX_PLAYERS:
+        raise HTTPException(status_code=400, detail=f"O torneio precisa ter de 2 a {TOURNAMENT_MAX_PLAYERS} jogadores")
+    if tipo not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(FORMATOS)}")
 
-    montar_chaves(db, tournament, inscritos, minimo_jogadores)
+    try:
+        tournament, inscritos, iniciado = inscrever(db, user_id, tournament_id, minimo_jogadores, tipo)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
 
-    tournament.status = "em_andamento"
-    db.commit()
+    if not iniciado:
+        return {
+            "message": f"Inscrito no torneio. Aguardando mais jogadores. {inscritos}/{minimo_jogadores}",
+            "tournament_id": tournament.id
+        }
 
-    return {"message": f"Torneio iniciado com {minimo_jogadores} jogadores"}
+    return {"message": f"Torneio iniciado com {inscritos} jogadores", "tournament_id": tournament.id}
 
 # ────────────────────────────────
 # ROTA: STATUS DO TORNEIO
 # ────────────────────────────────
 @router.get("/tournament/status/{tournament_id}")
-def get_tournament_status(tournament_id: int, db: Session = Depends(get_db)):
+def get_tournament_status(tournament_id: int, db: Session = Depends(get_db), page: int = 1, page_size: int = 500):
     tournament = db.query(Tournament).get(tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Torneio não encontrado")
 
+    page, page_size = max(page, 1), min(max(page_size, 1), 5000)
     data = {
         "id": tournament.id,
         "status": tournament.status,
+        "page": page,
         "matches": []
     }
 
-    for tm in tournament.matches:
+    # Consulta só as colunas necessárias, paginada, em vez de carregar tournament.matches inteiro
+    partidas = (
+        db.query(
+            TournamentMatch.match_id, TournamentMatch.round_number,
+            TournamentMatch.player1_id, TournamentMatch.player2_id, TournamentMatch.winner_id
+        )
+        .filter(TournamentMatch.tournament_id == tournament_id)
+        .order_by(TournamentMatch.round_number, TournamentMatch.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+
+    for match_id, round_number, player1_id, player2_id, winner_id in partidas:
         data["matches"].append({
-            "match_id": tm.match_id,
-            "round": tm.round_number,
-            "player1_id": tm.player1_id,
-            "player2_id": tm.player2_id,
-            "winner_id": tm.winner_id,
+            "match_id": match_id,
+            "round": round_number,
+            "player1_id": player1_id,
+            "player2_id": player2_id,
+            "winner_id": winner_id,
         })
 
     return data
 
+# ────────────────────────────────
+# ROTA: CHAVE DO TORNEIO (PAGINADA / STREAMING)
+# ────────────────────────────────
+@router.get("/tournament/{tournament_id}/bracket")
+def get_tournament_bracket(tournament_id: int, db: Session = Depends(get_db), page: int = 1, page_size: int = 100):
+    try:
+        return exportar_chave(db, tournament_id, max(page, 1), min(max(page_size, 1), 5000))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/tournament/{tournament_id}/bracket/stream")
+def stream_tournament_bracket(tournament_id: int):
+    # NDJSON: uma partida por linha, lida do banco em lotes
+    return StreamingResponse(transmitir_partidas(tournament_id), media_type="application/x-ndjson")
+
 # ────────────────────────────────
 # FUNÇÃO: DEFINIR VENCEDOR DE PARTIDA
 # ────────────────────────────────
@@ -124,6 +119,12 @@ def set_match_winner(db: Session, tournament_match_id: int, winner_user_id: int)
     tmatch = db.query(TournamentMatch).filter(TournamentMatch.id == tournament_match_id).first()
     if not tmatch:
         raise ValueError("Partida do torneio não encontrada")
+
+    # Torneios com chave em árvore avançam nó a nó
+    resultado = avancar_chave(db, tmatch, winner_user_id)
+    if resultado is not None:
+        return resultado
+
     if tmatch.winner_id is not None:
         raise ValueError("Partida já tem vencedor definido")
     if winner_user_id not in (tmatch.player1_id, tmatch.player2_id):
@@ -164,6 +165,7 @@ def set_match_winner(db: Session, tournament_match_id: int, winner_user_id: int)
         vencedor_torneio = db.query(User).get(tournament.winner_id)
         if vencedor_torneio:
             vencedor_torneio.vitorias = (vencedor_torneio.vitorias or 0) + 1
+        registrar_vitoria_torneio(db, tournament.winner_id)
 
         db.commit()
         return f"Torneio finalizado! Vencedor: usuário {tournament.winner_id}."
@@ -0,0 +1,187 @@
+# app/services/admission.py
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+from app.services import metrics
+
+load_dotenv()
+
+# Limites por rota cara: concorrência, tamanho da fila de espera e tempo máximo na fila.
+# Mantendo a soma das concorrências abaixo do threadpool (40 por padrão), sobram
+# threads para rotas baratas como /ranking e /tournament/status.
+LIMITES_ROTA = {
+    "question": {
+        "concorrencia": int(os.getenv("ADMISSION_QUESTION_CONCURRENCY", "16")),
+        "fila": int(os.getenv("ADMISSION_QUESTION_QUEUE", "32")),
+    },
+    "result": {
+        "concorrencia": int(os.getenv("ADMISSION_RESULT_CONCURRENCY", "4")),
+        "fila": int(os.getenv("ADMISSION_RESULT_QUEUE", "8")),
+    },
+}
+ADMISSION_WAIT_TIMEOUT = float(os.getenv("ADMISSION_WAIT_TIMEOUT", "2"))
+
+# Campo da requisição que identifica quem é limitado em cada rota.
+# /result não tem user_id: o limite vale por partida.
+# POST /answer não passa pela admissão: rejeitar ali descartaria a própria resposta.
+CHAVE_ROTA = {"question": "user_id", "result": "match_id"}
+# Quantidade de proxies confiáveis na frente da API (ex: 1 para um load balancer).
+# Com 0, X-Forwarded-For é ignorado (o cliente poderia forjá-lo).
+ADMISSION_TRUSTED_PROXIES = int(os.getenv("ADMISSION_TRUSTED_PROXIES", "0"))
+
+# Limite por usuário (token bucket): requisições por segundo e rajada máxima
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "2"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class Limitador:
+    """
+    Limite de concorrência com fila limitada. Quem espera não ocupa thread:
+    a espera acontece no event loop, antes de o endpoint síncrono ir para o threadpool.
+    """
+
+    def __init__(self, nome: str, concorrencia: int, fila: int, timeout: float):
+        self.nome = nome
+        self.concorrencia = concorrencia
+        self.fila = fila
+        self.timeout = timeout
+        self.em_execucao = 0
+        self.aguardando = 0
+        self._semaforo = None
+
+    def _publicar(self):
+        metrics.definir(f"admission_{self.nome}_in_flight", self.em_execucao)
+        metrics.definir(f"admission_{self.nome}_queue_depth", self.aguardando)
+
+    def _rejeitar(self, motivo: str):
+        metrics.incrementar(f"admission_{self.nome}_rejected_total")
+        metrics.incrementar(f"admission_{self.nome}_rejected_{motivo}_total")
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"}
+        )
+
+    async def entrar(self):
+        if self._semaforo is None:
+            # Criado aqui para ficar preso ao event loop em execução
+            self._semaforo = asyncio.Semaphore(self.concorrencia)
+
+        if not self._semaforo.locked():
+            # Vaga livre: acquire() não suspende, então ninguém passa na frente
+            await self._semaforo.acquire()
+        else:
+            if self.aguardando >= self.fila:
+                self._rejeitar("queue_full")
+
+            self.aguardando += 1
+            self._publicar()
+            inicio = time.monotonic()
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self._rejeitar("timeout")
+            finally:
+                self.aguardando -= 1
+                self._publicar()
+            metrics.registrar(f"admission_{self.nome}_wait_seconds", time.monotonic() - inicio)
+
+        self.em_execucao += 1
+        self._publicar()
+
+    def sair(self):
+        self.em_execucao -= 1
+        self._semaforo.release()
+        self._publicar()
+
+
+class LimiteUsuario:
+    """
+    Token bucket por chave (usuário, partida ou IP), com descarte LRU das chaves antigas.
+    """
+
+    def __init__(self, por_segundo: float, rajada: float, max_chaves: int):
+        self.por_segundo = por_segundo
+        self.rajada = rajada
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+
+    def consumir(self, chave: str) -> bool:
+        agora = time.monotonic()
+        tokens, ultimo = self._baldes.pop(chave, (self.rajada, agora))
+        tokens = min(self.rajada, tokens + (agora - ultimo) * self.por_segundo)
+
+        permitido = tokens >= 1
+        if permitido:
+            tokens -= 1
+
+        self._baldes[chave] = (tokens, agora)
+        if len(self._baldes) > self.max_chaves:
+            self._baldes.popitem(last=False)
+        return permitido
+
+
+_limitadores = {
+    nome: Limitador(nome, cfg["concorrencia"], cfg["fila"], ADMISSION_WAIT_TIMEOUT)
+    for nome, cfg in LIMITES_ROTA.items()
+}
+_limite_usuario = LimiteUsuario(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS)
+
+
+def ip_cliente(request: Request) -> str:
+    """
+    IP do cliente. Atrás de proxies confiáveis, usa a entrada de X-Forwarded-For
+    acrescentada pelo proxy mais externo; entradas à esquerda dela são do cliente.
+    """
+    encaminhado = request.headers.get("x-forwarded-for")
+    if ADMISSION_TRUSTED_PROXIES > 0 and encaminhado:
+        enderecos = [e.strip() for e in encaminhado.split(",") if e.strip()]
+        if enderecos:
+            return enderecos[-min(ADMISSION_TRUSTED_PROXIES, len(enderecos))]
+    return request.client.host if request.client else "-"
+
+
+def permitir_prefetch(user_id: int) -> bool:
+    """
+    Limite por usuário do prefetch em POST /answer. Checado dentro do endpoint:
+    acima do limite a resposta é aceita normalmente, só next_question fica de fora.
+    """
+    if _limite_usuario.consumir(f"prefetch:user_id:{user_id}"):
+        return True
+    metrics.incrementar("admission_prefetch_rate_limited_total")
+    return False
+
+
+def admissao(rota: str):
+    """
+    Dependência FastAPI para rotas caras: aplica o limite por usuário/partida (429)
+    e depois a concorrência/fila da rota (503).
+    """
+    limitador = _limitadores[rota]
+    campo = CHAVE_ROTA[rota]
+
+    async def dependencia(request: Request):
+        valor = request.query_params.get(campo)
+        chave = f"{campo}:{valor}" if valor is not None else f"ip:{ip_cliente(request)}"
+        if not _limite_usuario.consumir(f"{rota}:{chave}"):
+            metrics.incrementar(f"admission_{rota}_rate_limited_total")
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas requisições. Aguarde um pouco.",
+                headers={"Retry-After": "1"}
+            )
+
+        await limitador.entrar()
+        try:
+            yield
+        finally:
+            limitador.sair()
+
+    return dependencia
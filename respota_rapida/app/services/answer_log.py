@@ -0,0 +1,329 @@
+# app/services/answer_log.py
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava de arquivo, vale só a checagem de WEB_CONCURRENCY
+    fcntl = None
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, bindparam, select, tuple_
+
+from app.services import metrics
+
+load_dotenv()
+
+# Modo write-behind: respostas vão para um log local e são gravadas no banco em lotes
+ANSWER_WRITE_BEHIND = os.getenv("ANSWER_WRITE_BEHIND", "0") == "1"
+ANSWER_LOG_PATH = os.getenv("ANSWER_LOG_PATH", "answer_log.jsonl")
+# Intervalo do envio em lote ao banco (segundos)
+ANSWER_LOG_FLUSH_INTERVAL = float(os.getenv("ANSWER_LOG_FLUSH_INTERVAL", "0.2"))
+ANSWER_LOG_BATCH = int(os.getenv("ANSWER_LOG_BATCH", "1000"))
+# Tamanho a partir do qual o log é truncado quando tudo já foi persistido
+ANSWER_LOG_MAX_BYTES = int(os.getenv("ANSWER_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _chave(match_id, question_id, is_extra_round):
+    return match_id, question_id, bool(is_extra_round)
+
+
+def persistir_no_banco(entradas: list):
+    """
+    Grava um lote de respostas em MatchQuestion com um único UPDATE executemany
+    e soma nas estatísticas dos jogadores, na mesma transação, só as respostas
+    cuja linha ainda estava sem resposta. Assim o replay após uma queda é idempotente
+    tanto para MatchQuestion quanto para player_stats.
+    """
+    # Importados aqui: o log em si (e o benchmark) não depende do banco nem dos modelos
+    from app.config import SessionLocal
+    from app.models import MatchQuestion
+    from app.services.player_stats import registrar_respostas
+
+    tabela = MatchQuestion.__table__
+    comando = (
+        tabela.update()
+        .where(and_(
+            tabela.c.match_id == bindparam("b_match_id"),
+            tabela.c.question_id == bindparam("b_question_id"),
+            tabela.c.is_extra_round == bindparam("b_is_extra_round"),
+            tabela.c.answered_by_user_id.is_(None)
+        ))
+        .values(
+            answered_by_user_id=bindparam("b_user_id"),
+            selected_option=bindparam("b_selected_option"),
+            time_taken=bindparam("b_time_taken"),
+            is_correct=bindparam("b_is_correct")
+        )
+    )
+
+    db = SessionLocal()
+    try:
+        # Trava as linhas ainda sem resposta; só elas serão atualizadas e contadas
+        livres = {
+            _chave(*linha) for linha in db.execute(
+                select(tabela.c.match_id, tabela.c.question_id, tabela.c.is_extra_round)
+                .where(
+                    tuple_(tabela.c.match_id, tabela.c.question_id).in_(
+                        list({(e["match_id"], e["question_id"]) for e in entradas})
+                    ),
+                    tabela.c.answered_by_user_id.is_(None)
+                )
+                .with_for_update()
+            )
+        }
+        novas = []
+        for e in entradas:
+            chave = _chave(e["match_id"], e["question_id"], e.get("is_extra_round", False))
+            if chave in livres:
+                livres.discard(chave)
+                novas.append(e)
+
+        if novas:
+            db.execute(comando, _parametros(novas))
+            registrar_respostas(db, novas)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _parametros(entradas: list) -> list:
+    return [
+        {
+            "b_match_id": e["match_id"],
+            "b_question_id": e["question_id"],
+            "b_is_extra_round": e.get("is_extra_round", False),
+            "b_user_id": e["user_id"],
+            "b_selected_option": e["selected_option"],
+            "b_time_taken": e["time_taken"],
+            "b_is_correct": e["is_correct"]
+        }
+        for e in entradas
+    ]
+
+
+class AnswerLog:
+    """
+    Log append-only de respostas. registrar() só retorna depois do fsync, feito em grupo:
+    o primeiro escritor sem fsync em andamento sincroniza por todos que chegaram antes.
+    Uma thread separada descarrega o log no banco em lotes e grava o checkpoint.
+    """
+
+    def __init__(self, caminho: str, persistir=persistir_no_banco,
+                 intervalo_flush: float = ANSWER_LOG_FLUSH_INTERVAL):
+        self.caminho = caminho
+        self.caminho_checkpoint = caminho + ".checkpoint"
+        self.persistir = persistir
+        self.intervalo_flush = intervalo_flush
+
+        self._lock = threading.Lock()
+        self._duravel = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._seq = 0
+        self._seq_duravel = 0
+        self._sincronizando = False
+        self._pendentes = []
+        self._rodando = False
+
+        self._seq_persistida = self._ler_checkpoint()
+        self._seq = self._seq_duravel = self._seq_persistida
+        self._arquivo = open(self.caminho, "a+", encoding="utf-8")
+        self._travar()
+
+    def _travar(self):
+        """
+        Trava exclusiva no log: um segundo processo com o mesmo caminho falha na partida,
+        em vez de truncar, recuperar ou descarregar entradas que não são dele.
+        """
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._arquivo.close()
+            raise RuntimeError(
+                f"{self.caminho} já está em uso por outro processo. "
+                "ANSWER_WRITE_BEHIND exige um único worker por log."
+            )
+
+    # ---------- checkpoint e recuperação ----------
+
+    def _ler_checkpoint(self) -> int:
+        try:
+            with open(self.caminho_checkpoint, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _gravar_checkpoint(self, seq: int):
+        temporario = self.caminho_checkpoint + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_checkpoint)
+
+    def recuperar(self) -> int:
+        """
+        Relê o log após uma queda e reenfileira as respostas ainda não persistidas.
+        Linhas truncadas no fim do arquivo (escrita interrompida) são ignoradas.
+        """
+        recuperadas = 0
+        with self._lock:
+            self._arquivo.seek(0)
+            linha = ""
+            for linha in self._arquivo:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                self._seq = max(self._seq, entrada["seq"])
+                if entrada["seq"] > self._seq_persistida:
+                    self._pendentes.append(entrada)
+                    recuperadas += 1
+            self._seq_duravel = self._seq
+            self._arquivo.seek(0, os.SEEK_END)
+            if linha and not linha.endswith("\n"):
+                # Fecha a linha incompleta para não corromper a próxima entrada
+                self._arquivo.write("\n")
+
+        if recuperadas:
+            metrics.incrementar("answer_log_recovered_total", recuperadas)
+            self.descarregar()
+        return recuperadas
+
+    # ---------- escrita ----------
+
+    def registrar(self, entrada: dict):
+        """
+        Acrescenta a resposta ao log e só retorna quando ela estiver em disco.
+        """
+        with self._lock:
+            self._seq += 1
+            entrada = dict(entrada, seq=self._seq)
+            self._arquivo.write(json.dumps(entrada, separators=(",", ":")) + "\n")
+            self._pendentes.append(entrada)
+            metrics.definir("answer_log_pending", len(self._pendentes))
+            seq = self._seq
+
+        self._sincronizar(seq)
+
+    def _sincronizar(self, seq: int = None):
+        """
+        Garante fsync até seq (ou até a última entrada). Se já houver um fsync
+        em andamento, espera por ele e, se preciso, lidera o próximo grupo.
+        """
+        with self._lock:
+            if seq is None:
+                seq = self._seq
+            while self._seq_duravel < seq:
+                if self._sincronizando:
+                    self._duravel.wait()
+                    continue
+
+                self._sincronizando = True
+                self._arquivo.flush()
+                alvo = self._seq
+                self._lock.release()
+                sincronizado = False
+                try:
+                    # fsync fora do lock: novas respostas continuam entrando e vão no próximo grupo
+                    os.fsync(self._arquivo.fileno())
+                    sincronizado = True
+                finally:
+                    self._lock.acquire()
+                    self._sincronizando = False
+                    if sincronizado:
+                        self._seq_duravel = max(self._seq_duravel, alvo)
+                    self._duravel.notify_all()
+                metrics.incrementar("answer_log_fsyncs_total")
+
+    # ---------- envio ao banco ----------
+
+    def descarregar(self) -> int:
+        """
+        Envia ao banco todas as respostas pendentes, em lotes, e avança o checkpoint.
+        """
+        with self._flush_lock:
+            self._sincronizar()
+            with self._lock:
+                lote, self._pendentes = self._pendentes, []
+                metrics.definir("answer_log_pending", 0)
+
+            if not lote:
+                return 0
+
+            for i in range(0, len(lote), ANSWER_LOG_BATCH):
+                parte = lote[i:i + ANSWER_LOG_BATCH]
+                try:
+                    self.persistir(parte)
+                except Exception:
+                    # Devolve o que não foi gravado para a próxima tentativa
+                    with self._lock:
+                        self._pendentes[:0] = lote[i:]
+                        metrics.definir("answer_log_pending", len(self._pendentes))
+                    raise
+                metrics.incrementar("answer_log_flushed_total", len(parte))
+                self._seq_persistida = parte[-1]["seq"]
+                self._gravar_checkpoint(self._seq_persistida)
+
+            self._compactar()
+            return len(lote)
+
+    def _compactar(self):
+        # Trunca o log quando ficou grande e tudo nele já está no banco
+        with self._lock:
+            if self._pendentes or self._seq_persistida != self._seq:
+                return
+            if self._arquivo.tell() < ANSWER_LOG_MAX_BYTES:
+                return
+            self._arquivo.truncate(0)
+            self._arquivo.seek(0)
+
+    # ---------- threads de background ----------
+
+    def _loop_flush(self):
+        while self._rodando:
+            time.sleep(self.intervalo_flush)
+            try:
+                self.descarregar()
+            except Exception as e:
+                metrics.incrementar("answer_log_flush_errors_total")
+                print("Erro ao descarregar log de respostas:", e)
+
+    def iniciar(self):
+        self._rodando = True
+        threading.Thread(target=self._loop_flush, daemon=True).start()
+
+    def parar(self):
+        self._rodando = False
+        self.descarregar()
+        self._arquivo.close()
+
+
+def _criar_answer_log():
+    # Com vários workers cada um teria seu próprio log, e GET /result só descarrega
+    # o do worker que atendeu: a pontuação sairia sem respostas dos demais
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError("ANSWER_WRITE_BEHIND exige um único worker (WEB_CONCURRENCY=1).")
+    return AnswerLog(ANSWER_LOG_PATH)
+
+
+answer_log = _criar_answer_log() if ANSWER_WRITE_BEHIND else None
+
+
+def iniciar_answer_log():
+    """
+    Recupera respostas não persistidas de uma execução anterior e inicia as threads do log.
+    """
+    if answer_log is not None:
+        answer_log.recuperar()
+        answer_log.iniciar()
+
+
+def parar_answer_log():
+    if answer_log is not None:
+        answer_log.parar()
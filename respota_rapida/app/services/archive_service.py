@@ -0,0 +1,170 @@
+# app/services/archive_service.py
+#
+# Ciclo de vida dos dados: move as linhas de match_questions das partidas encerradas
+# para uma tabela de arquivo compacta (ou arquivos .jsonl.gz), em lotes.
+# A tabela questions não é arquivada: ela é o banco de perguntas reaproveitado pelo
+# fallback do provedor e pelos pools calibrados (question_profiles).
+# Uso:
+#   python -m app.services.archive_service                 # arquiva em tabelas
+#   python -m app.services.archive_service --export DIR    # exporta para arquivos e remove
+#   python -m app.services.archive_service --ddl           # imprime DDL de índices/partições
+
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, func, select, insert
+
+from app.config import Base, SessionLocal, engine
+from app.models import MatchQuestion
+
+# Partida é considerada encerrada se não recebe pergunta há esse tempo (horas)
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))
+# Quantidade de partidas movidas por transação
+ARCHIVE_BATCH_MATCHES = int(os.getenv("ARCHIVE_BATCH_MATCHES", "500"))
+# Largura (em match_id) de cada partição de match_questions
+ARCHIVE_PARTITION_SIZE = int(os.getenv("ARCHIVE_PARTITION_SIZE", "250000"))
+
+
+class MatchQuestionArchive(Base):
+    """
+    Cópia compacta de MatchQuestion para partidas encerradas.
+    """
+    __tablename__ = "match_questions_archive"
+
+    id = Column(Integer, primary_key=True)  # mesmo id da linha original
+    match_id = Column(Integer, nullable=False, index=True)
+    question_id = Column(Integer, nullable=False)
+    answered_by_user_id = Column(Integer, nullable=True, index=True)
+    selected_option = Column(String(1), nullable=True)
+    time_taken = Column(Float, nullable=True)
+    is_correct = Column(Boolean, nullable=True)
+    is_extra_round = Column(Boolean, nullable=False, default=False)
+    sent_at = Column(DateTime, nullable=True)
+
+
+COLUNAS_MATCH_QUESTION = [
+    "id", "match_id", "question_id", "answered_by_user_id", "selected_option",
+    "time_taken", "is_correct", "is_extra_round", "sent_at"
+]
+
+
+def partidas_encerradas(db, a_partir_de: int, limite: int) -> list:
+    """
+    Próximo lote de partidas (ordenadas por id) sem perguntas recentes.
+    Paginação por chave (match_id > a_partir_de), sem OFFSET.
+    """
+    corte = datetime.utcnow() - timedelta(hours=ARCHIVE_AFTER_HOURS)
+    linhas = (
+        db.query(MatchQuestion.match_id)
+        .filter(MatchQuestion.match_id > a_partir_de)
+        .group_by(MatchQuestion.match_id)
+        .having(func.max(MatchQuestion.sent_at) < corte)
+        .order_by(MatchQuestion.match_id)
+        .limit(limite)
+        .all()
+    )
+    return [linha[0] for linha in linhas]
+
+
+def _exportar(diretorio: str, nome: str, colunas: list, linhas):
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, nome)
+    with gzip.open(caminho, "at", encoding="utf-8") as f:
+        for linha in linhas:
+            registro = dict(zip(colunas, linha))
+            if isinstance(registro.get("sent_at"), datetime):
+                registro["sent_at"] = registro["sent_at"].isoformat()
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def arquivar_lote(db, match_ids: list, exportar_para: str = None) -> int:
+    """
+    Move as perguntas das partidas informadas para o arquivo e remove da tabela quente.
+    """
+    tabela_mq = MatchQuestion.__table__
+    filtro_partidas = tabela_mq.c.match_id.in_(match_ids)
+
+    colunas_mq = [tabela_mq.c[nome] for nome in COLUNAS_MATCH_QUESTION]
+    if exportar_para:
+        sufixo = f"{match_ids[0]}_{match_ids[-1]}"
+        linhas = db.execute(select(*colunas_mq).where(filtro_partidas).order_by(tabela_mq.c.id))
+        _exportar(exportar_para, f"match_questions_{sufixo}.jsonl.gz", COLUNAS_MATCH_QUESTION, linhas)
+    else:
+        db.execute(insert(MatchQuestionArchive.__table__).from_select(
+            COLUNAS_MATCH_QUESTION,
+            select(*colunas_mq).where(filtro_partidas)
+        ))
+    movidas = db.execute(tabela_mq.delete().where(filtro_partidas)).rowcount
+
+    db.commit()
+    return movidas
+
+
+def arquivar(exportar_para: str = None) -> int:
+    """
+    Percorre todas as partidas encerradas em lotes, com uma transação por lote.
+    """
+    MatchQuestionArchive.__table__.create(bind=engine, checkfirst=True)
+
+    total, ultimo_match_id = 0, 0
+    db = SessionLocal()
+    try:
+        while True:
+            match_ids = partidas_encerradas(db, ultimo_match_id, ARCHIVE_BATCH_MATCHES)
+            if not match_ids:
+                break
+            total += arquivar_lote(db, match_ids, exportar_para)
+            ultimo_match_id = match_ids[-1]
+            print(f"Arquivadas partidas até {ultimo_match_id} ({total} linhas de match_questions)")
+    finally:
+        db.close()
+    return total
+
+
+def ddl_tabela_quente(max_match_id: int) -> list:
+    """
+    DDL (MySQL) para manter as consultas ao vivo estáveis: índices das consultas por
+    partida/jogador e da busca de partidas encerradas, e particionamento por faixa de
+    match_id. Como as consultas ao vivo filtram por match_id, o MySQL lê só a partição
+    da partida (partition pruning). A chave de partição precisa estar em toda chave única,
+    por isso a chave primária passa a ser (id, match_id). O MySQL não aceita chaves
+    estrangeiras em tabelas particionadas, então elas precisam ser removidas antes do ALTER.
+    """
+    tabela = MatchQuestion.__tablename__
+    comandos = [
+        f"CREATE INDEX ix_{tabela}_match_user ON {tabela} (match_id, answered_by_user_id, is_extra_round)",
+        f"CREATE INDEX ix_{tabela}_match_question ON {tabela} (match_id, question_id)",
+        f"CREATE INDEX ix_{tabela}_match_sent ON {tabela} (match_id, sent_at)",
+    ]
+
+    comandos.append(f"ALTER TABLE {tabela} DROP PRIMARY KEY, ADD PRIMARY KEY (id, match_id)")
+
+    particoes = []
+    limite = ARCHIVE_PARTITION_SIZE
+    while limite <= max_match_id + ARCHIVE_PARTITION_SIZE:
+        particoes.append(f"PARTITION p{limite // ARCHIVE_PARTITION_SIZE} VALUES LESS THAN ({limite})")
+        limite += ARCHIVE_PARTITION_SIZE
+    particoes.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    comandos.append(f"ALTER TABLE {tabela} PARTITION BY RANGE (match_id) ({', '.join(particoes)})")
+    return comandos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva partidas encerradas")
+    parser.add_argument("--export", metavar="DIR", help="exporta para arquivos .jsonl.gz em vez de tabelas")
+    parser.add_argument("--ddl", action="store_true", help="apenas imprime o DDL de índices e partições")
+    args = parser.parse_args()
+
+    if args.ddl:
+        db = SessionLocal()
+        try:
+            max_match_id = db.query(func.max(MatchQuestion.match_id)).scalar() or 0
+        finally:
+            db.close()
+        for comando in ddl_tabela_quente(max_match_id):
+            print(comando + ";")
+    else:
+        print(f"Total arquivado: {arquivar(args.export)} linhas")
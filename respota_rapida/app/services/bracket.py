@@ -0,0 +1,168 @@
+# app/services/bracket.py
+
+import math
+from array import array
+
+VAZIO = 0   # nó ainda sem vencedor
+BYE = -1    # posição sem jogador (passagem automática)
+
+
+def proxima_potencia_de_dois(n: int) -> int:
+    return 1 << max(1, math.ceil(math.log2(max(n, 2))))
+
+
+def ordem_seeds(tamanho: int) -> list:
+    """
+    Ordem padrão de cabeças de chave: 1 x N, 2 x N-1..., com os melhores
+    seeds só se encontrando nas rodadas finais.
+    """
+    seeds = [1]
+    while len(seeds) < tamanho:
+        n = len(seeds) * 2
+        seeds = [x for s in seeds for x in (s, n + 1 - s)]
+    return seeds
+
+
+class Chave:
+    """
+    Chave eliminatória em árvore binária sobre arrays (heap): o nó i tem filhos
+    2i e 2i+1 e pai i // 2; as folhas ficam em [tamanho, 2 * tamanho).
+    vencedores[i] guarda o user_id que ocupa o nó e partidas[i] o TournamentMatch
+    que decide o nó. Avançar, consultar pai/irmão e achar a rodada são O(1).
+    """
+
+    def __init__(self, tamanho: int, vencedores: array = None, partidas: array = None):
+        self.tamanho = tamanho
+        self.vencedores = vencedores if vencedores is not None else array("i", [VAZIO] * (2 * tamanho))
+        self.partidas = partidas if partidas is not None else array("i", [VAZIO] * (2 * tamanho))
+
+    # ---------- criação e serialização ----------
+
+    @classmethod
+    def criar(cls, jogadores_por_seed: list) -> "Chave":
+        """
+        Monta a chave com os jogadores já ordenados por seed (melhor primeiro).
+        Posições que sobram viram byes e são resolvidas na hora.
+        """
+        tamanho = proxima_potencia_de_dois(len(jogadores_por_seed))
+        chave = cls(tamanho)
+        for posicao, seed in enumerate(ordem_seeds(tamanho)):
+            jogador = jogadores_por_seed[seed - 1] if seed <= len(jogadores_por_seed) else BYE
+            chave.vencedores[tamanho + posicao] = jogador
+
+        for no in range(tamanho - 1, 0, -1):
+            chave._resolver_bye(no)
+        return chave
+
+    @classmethod
+    def carregar(cls, tamanho: int, vencedores: bytes, partidas: bytes) -> "Chave":
+        v, p = array("i"), array("i")
+        v.frombytes(vencedores)
+        p.frombytes(partidas)
+        return cls(tamanho, v, p)
+
+    def serializar(self):
+        return self.vencedores.tobytes(), self.partidas.tobytes()
+
+    # ---------- navegação ----------
+
+    @property
+    def total_rodadas(self) -> int:
+        return int(math.log2(self.tamanho))
+
+    def rodada(self, no: int) -> int:
+        # Folhas estão no nível log2(tamanho); a primeira rodada decide o nível acima delas
+        return self.total_rodadas - (no.bit_length() - 1)
+
+    def filhos(self, no: int):
+        return self.vencedores[2 * no], self.vencedores[2 * no + 1]
+
+    def campeao(self):
+        vencedor = self.vencedores[1]
+        return vencedor if vencedor > 0 else None
+
+    def prontos(self) -> list:
+        """
+        Nós com os dois jogadores definidos e ainda sem partida criada.
+        """
+        return [
+            no for no in range(1, self.tamanho)
+            if self.vencedores[no] == VAZIO and self.partidas[no] == VAZIO
+            and min(self.filhos(no)) > 0
+        ]
+
+    # ---------- avanço ----------
+
+    def _resolver_bye(self, no: int):
+        a, b = self.filhos(no)
+        if self.vencedores[no] != VAZIO or VAZIO in (a, b):
+            return False
+        if a == BYE or b == BYE:
+            self.vencedores[no] = b if a == BYE else a
+            return True
+        return False
+
+    def registrar_vencedor(self, no: int, vencedor: int):
+        """
+        Grava o vencedor do nó e sobe pela árvore enquanto houver byes.
+        Retorna o nó pai se ele ficou pronto para ter partida, senão None.
+        """
+        if vencedor not in self.filhos(no):
+            raise ValueError("Vencedor informado não é jogador desta partida")
+        if self.vencedores[no] != VAZIO:
+            raise ValueError("Partida já tem vencedor definido")
+
+        self.vencedores[no] = vencedor
+        pai = no // 2
+        while pai >= 1 and self._resolver_bye(pai):
+            pai //= 2
+        if pai >= 1 and self.vencedores[pai] == VAZIO and min(self.filhos(pai)) > 0:
+            return pai
+        return None
+
+    def pagina(self, inicio: int, quantidade: int) -> list:
+        """
+        Nós internos [inicio, inicio + quantidade) no formato de exportação, sem tocar no banco.
+        """
+        nos = []
+        for no in range(max(inicio, 1), min(inicio + quantidade, self.tamanho)):
+            a, b = self.filhos(no)
+            nos.append({
+                "node": no,
+                "round": self.rodada(no),
+                "tournament_match_id": self.partidas[no] or None,
+                "player1_id": a if a > 0 else None,
+                "player2_id": b if b > 0 else None,
+                "winner_id": self.vencedores[no] if self.vencedores[no] > 0 else None,
+                "bye": BYE in (a, b)
+            })
+        return nos
+
+
+def rodadas_suico(jogadores: int) -> int:
+    return max(1, math.ceil(math.log2(max(jogadores, 2))))
+
+
+def parear_suico(classificacao: list, confrontos: set, ja_tiveram_bye: set):
+    """
+    Pareamento suíço guloso: percorre a classificação (melhor primeiro) e junta cada
+    jogador ao próximo livre contra quem ainda não jogou. Com número ímpar, o pior
+    colocado que ainda não teve bye folga na rodada.
+    Retorna (pares, jogador_com_bye).
+    """
+    restantes = list(classificacao)
+    bye = None
+    if len(restantes) % 2:
+        candidatos = [j for j in reversed(restantes) if j not in ja_tiveram_bye]
+        bye = candidatos[0] if candidatos else restantes[-1]
+        restantes.remove(bye)
+
+    pares = []
+    while restantes:
+        jogador = restantes.pop(0)
+        indice = next(
+            (i for i, outro in enumerate(restantes) if frozenset((jogador, outro)) not in confrontos),
+            0  # todos já se enfrentaram: repete o confronto mais próximo na tabela
+        )
+        pares.append((jogador, restantes.pop(indice)))
+    return pares, bye
@@ -0,0 +1,122 @@
+# app/services/llm_cache.py
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.services import metrics
+
+load_dotenv()
+
+# Caminho do arquivo SQLite do cache. Sem ele o cache fica desligado.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+# Quantidade máxima de respostas guardadas (as menos usadas são descartadas)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Quantas respostas distintas guardar para o mesmo prompt/parâmetros
+LLM_CACHE_SLOTS = int(os.getenv("LLM_CACHE_SLOTS", "100"))
+# Fração das gerações que pode ser atendida pelo cache (1.0 = sempre que houver)
+LLM_CACHE_REUSE_RATIO = float(os.getenv("LLM_CACHE_REUSE_RATIO", "1.0"))
+# Semente para sortear slots: mesma semente, mesma sequência de respostas (execuções reproduzíveis)
+LLM_CACHE_SEED = os.getenv("LLM_CACHE_SEED")
+
+_rng = random.Random(int(LLM_CACHE_SEED)) if LLM_CACHE_SEED is not None else random.Random()
+_conn = None
+_total = 0
+_lock = threading.Lock()
+
+
+def _conexao():
+    global _conn, _total
+    if _conn is None:
+        _conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)")
+        _total = _conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    return _conn
+
+
+def chave(model: str, prompt: str, params: dict, slot: int) -> str:
+    """
+    Hash do conteúdo da requisição: modelo, prompt, parâmetros e slot.
+    """
+    bruto = json.dumps(
+        {"model": model, "prompt": prompt, "params": params, "slot": slot},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _ler(key: str):
+    with _lock:
+        conn = _conexao()
+        linha = conn.execute("SELECT content FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if linha is not None:
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        return linha[0] if linha else None
+
+
+def _gravar(key: str, content: str):
+    global _total
+    with _lock:
+        conn = _conexao()
+        agora = time.time()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO llm_cache (key, content, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, content, agora, agora)
+        )
+        if cursor.rowcount:
+            _total += 1
+        else:
+            conn.execute("UPDATE llm_cache SET content = ?, last_used = ? WHERE key = ?", (content, agora, key))
+
+        excesso = _total - LLM_CACHE_MAX_ENTRIES
+        if excesso > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (excesso,)
+            )
+            _total -= excesso
+            metrics.incrementar("llm_cache_evictions_total", excesso)
+        conn.commit()
+
+
+def obter_ou_gerar(model: str, prompt: str, params: dict, gerar):
+    """
+    Devolve o conteúdo em cache para (model, prompt, params, slot sorteado)
+    ou chama gerar() e guarda o resultado naquele slot.
+    """
+    if not LLM_CACHE_PATH:
+        return gerar()
+
+    with _lock:
+        slot = _rng.randrange(LLM_CACHE_SLOTS)
+        reutilizar = _rng.random() < LLM_CACHE_REUSE_RATIO
+    key = chave(model, prompt, params, slot)
+
+    if reutilizar:
+        content = _ler(key)
+        if content is not None:
+            metrics.incrementar("llm_cache_hits_total")
+            return content
+
+    metrics.incrementar("llm_cache_misses_total")
+    content = gerar()
+    _gravar(key, content)
+    return content
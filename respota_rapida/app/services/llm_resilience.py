@@ -0,0 +1,171 @@
+# app/services/llm_resilience.py
+
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+
+from app.services import metrics
+from app.services.openai_service import solicitar_pergunta, OPENAI_TIMEOUT
+
+# Tentativas extras após a primeira chamada e orçamento total de tempo por geração
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BUDGET = float(os.getenv("LLM_RETRY_BUDGET", "15"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+
+# Circuito abre após N falhas seguidas e fica aberto por X segundos
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio_aberto"
+_CODIGO_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+
+class CircuitBreaker:
+    """
+    Disjuntor simples: fechado deixa passar, aberto rejeita até o tempo de reset,
+    meio aberto libera uma única chamada de teste.
+    """
+
+    def __init__(self, limite_falhas: int, tempo_reset: float, nome: str = "llm"):
+        self.limite_falhas = limite_falhas
+        self.tempo_reset = tempo_reset
+        self.nome = nome
+        self.estado = FECHADO
+        self.falhas = 0
+        self.aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+        self._publicar()
+
+    def _publicar(self):
+        metrics.definir(f"{self.nome}_circuit_state", _CODIGO_ESTADO[self.estado])
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO and time.monotonic() - self.aberto_em >= self.tempo_reset:
+                self.estado = MEIO_ABERTO
+                self._publicar()
+            if self.estado == MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def sucesso(self):
+        with self._lock:
+            self.estado = FECHADO
+            self.falhas = 0
+            self._teste_em_andamento = False
+            self._publicar()
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.estado == MEIO_ABERTO or self.falhas >= self.limite_falhas:
+                if self.estado != ABERTO:
+                    metrics.incrementar(f"{self.nome}_circuit_opened_total")
+                self.estado = ABERTO
+                self.aberto_em = time.monotonic()
+            self._publicar()
+
+
+breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET)
+
+
+def gerar_pergunta_resiliente(categoria: str = None, dificuldade: str = None):
+    """
+    Gera uma pergunta com timeout por chamada, tentativas limitadas com jitter
+    e respeitando o disjuntor. Retorna None quando o provedor está degradado.
+    """
+    inicio = time.monotonic()
+
+    for tentativa in range(LLM_MAX_RETRIES + 1):
+        # Orçamento antes do disjuntor: permitir() pode reservar a vaga de teste do meio aberto,
+        # que só é liberada por sucesso() ou falha()
+        restante = LLM_RETRY_BUDGET - (time.monotonic() - inicio)
+        if restante <= 0:
+            break
+
+        if not breaker.permitir():
+            metrics.incrementar("llm_rejected_by_breaker_total")
+            return None
+
+        metrics.incrementar("llm_requests_total")
+        try:
+            pergunta = solicitar_pergunta(
+                timeout=min(OPENAI_TIMEOUT, restante),
+                categoria=categoria,
+                dificuldade=dificuldade
+            )
+        except Exception as e:
+            print("Erro ao gerar pergunta:", e)
+            metrics.incrementar("llm_failures_total")
+            breaker.falha()
+        else:
+            breaker.sucesso()
+            return pergunta
+
+        if tentativa < LLM_MAX_RETRIES:
+            # Backoff exponencial com jitter completo, sem estourar o orçamento
+            espera = random.uniform(0, LLM_BACKOFF_BASE * (2 ** tentativa))
+            restante = LLM_RETRY_BUDGET - (time.monotonic() - inicio)
+            if espera >= restante:
+                break
+            metrics.incrementar("llm_retries_total")
+            time.sleep(espera)
+
+    return None
+
+
+def pergunta_armazenada(db: Session, categoria: str = None, dificuldade: str = None, match_id: int = None):
+    """
+    Fallback para provedor degradado: reaproveita uma pergunta já salva no banco,
+    respeitando categoria e dificuldade calibrada quando informadas.
+    Perguntas já usadas na partida ficam de fora: (match_id, question_id) identifica
+    a resposta, o token e o registro de tempo.
+    Sorteia um id e pega a primeira pergunta a partir dele, evitando ORDER BY RAND().
+    """
+    # Importados aqui: o disjuntor e as tentativas não dependem dos modelos do banco
+    from app.models import Question, MatchQuestion
+    from app.services.question_calibration import QuestionProfile
+
+    query = db.query(Question)
+    if match_id is not None:
+        query = query.filter(~exists().where(
+            (MatchQuestion.match_id == match_id) & (MatchQuestion.question_id == Question.id)
+        ))
+    if categoria or dificuldade:
+        query = query.join(QuestionProfile, QuestionProfile.question_id == Question.id)
+        if categoria:
+            query = query.filter(QuestionProfile.category == categoria)
+        if dificuldade:
+            query = query.filter(QuestionProfile.difficulty == dificuldade)
+
+    max_id = query.with_entities(func.max(Question.id)).scalar()
+    if not max_id:
+        return None
+
+    question_db = (
+        query.filter(Question.id >= random.randint(1, max_id))
+        .order_by(Question.id)
+        .first()
+    )
+    if not question_db:
+        return None
+
+    metrics.incrementar("llm_fallback_total")
+    return {
+        "id": question_db.id,  # indica pergunta existente, não cria nova linha
+        "question": question_db.question_text,
+        "options": None,  # o payload sai do cache por question_id; options só é decodificado se faltar
+        "correct_option": question_db.correct_option,
+        "tip": question_db.tip,
+        "category": categoria,
+        "difficulty": dificuldade
+    }
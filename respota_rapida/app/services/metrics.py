@@ -0,0 +1,55 @@
+# app/services/metrics.py
+
+import threading
+
+# Métricas em memória do processo: contadores, valores atuais e resumos (count/sum/min/max)
+_contadores = {}
+_valores = {}
+_resumos = {}
+_lock = threading.Lock()
+
+
+def incrementar(nome: str, valor: float = 1):
+    """
+    Soma valor ao contador informado.
+    """
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+
+def definir(nome: str, valor: float):
+    """
+    Define o valor atual de uma métrica (ex: estado do circuito, tamanho de fila).
+    """
+    with _lock:
+        _valores[nome] = valor
+
+
+def registrar(nome: str, valor: float):
+    """
+    Registra uma observação no resumo da métrica.
+    """
+    with _lock:
+        resumo = _resumos.get(nome)
+        if resumo is None:
+            _resumos[nome] = {"count": 1, "sum": valor, "min": valor, "max": valor}
+            return
+        resumo["count"] += 1
+        resumo["sum"] += valor
+        resumo["min"] = min(resumo["min"], valor)
+        resumo["max"] = max(resumo["max"], valor)
+
+
+def snapshot() -> dict:
+    """
+    Retorna uma cópia de todas as métricas registradas.
+    """
+    with _lock:
+        resumos = {}
+        for nome, resumo in _resumos.items():
+            resumos[nome] = dict(resumo, avg=resumo["sum"] / resumo["count"])
+        return {
+            "counters": dict(_contadores),
+            "gauges": dict(_valores),
+            "summaries": resumos
+        }
@@ -1,15 +1,29 @@
 # app/services/openai_service.py
 
 import os
+import json
 import openai
 from dotenv import load_dotenv
 
+from app.services import llm_cache
+
 load_dotenv()
 openai.api_key = os.getenv("API_KEY")
 
-def gerar_pergunta():
-    prompt = """
-    Gere uma pergunta de conhecimentos gerais com:
+# Permite apontar para outro endpoint compatível (ex: servidor falso em testes de carga)
+if os.getenv("OPENAI_API_BASE"):
+    openai.api_base = os.getenv("OPENAI_API_BASE")
+
+# Tempo máximo (segundos) de cada chamada ao modelo
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "8"))
+
+MODELO = "gpt-3.5-turbo"
+PARAMETROS = {"max_tokens": 300, "temperature": 0.7}
+
+DIFICULDADES = {"facil": "fácil", "media": "média", "dificil": "difícil"}
+
+PROMPT = """
+    Gere uma pergunta de {tema} com:
     - enunciado
     - 4 alternativas (A, B, C, D)
     - identifique a correta
@@ -29,17 +43,44 @@ def gerar_pergunta():
     }
     """
 
-    try:
+def montar_prompt(categoria: str = None, dificuldade: str = None) -> str:
+    """
+    Monta o prompt com tema e dificuldade. Sem nenhum dos dois, mantém o prompt
+    original de conhecimentos gerais (e as mesmas chaves de cache).
+    """
+    tema = categoria or "conhecimentos gerais"
+    if dificuldade:
+        tema += f", de dificuldade {DIFICULDADES[dificuldade]},"
+    return PROMPT.replace("{tema}", tema)
+
+def solicitar_pergunta(timeout: float = OPENAI_TIMEOUT, categoria: str = None, dificuldade: str = None):
+    """
+    Chama o modelo uma única vez e devolve a pergunta já decodificada,
+    marcada com a categoria e a dificuldade pedidas.
+    Não trata erros: timeout, falha de rede ou JSON inválido sobem como exceção.
+    """
+    prompt = montar_prompt(categoria, dificuldade)
+
+    def chamar_modelo():
         response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+            model=MODELO,
             messages=[{"role": "user", "content": prompt}],
-            max_tokens=300,
-            temperature=0.7
+            request_timeout=timeout,
+            **PARAMETROS
         )
-
         content = response.choices[0].message["content"]
-        return eval(content)  # ou use json.loads() se garantir formato JSON puro
+        json.loads(content)  # valida antes de ir para o cache
+        return content
+
+    content = llm_cache.obter_ou_gerar(MODELO, prompt, PARAMETROS, chamar_modelo)
+    pergunta = json.loads(content)
+    pergunta["category"] = categoria
+    pergunta["difficulty"] = dificuldade
+    return pergunta
 
+def gerar_pergunta(categoria: str = None, dificuldade: str = None):
+    try:
+        return solicitar_pergunta(categoria=categoria, dificuldade=dificuldade)
     except Exception as e:
         print("Erro ao gerar pergunta:", e)
         return None
@@ -0,0 +1,252 @@
+# app/services/player_stats.py
+#
+# Estatísticas materializadas por jogador, atualizadas incrementalmente.
+# Reconstrução completa a partir do histórico (em lotes de partidas), com o tráfego parado:
+#   python -m app.services.player_stats --rebuild
+
+import argparse
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Float, DateTime, func, select, case
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.orm import Session
+
+from app.config import Base, SessionLocal, engine
+from app.models import MatchQuestion, Tournament
+from app.services.archive_service import MatchQuestionArchive
+
+# Largura (em match_id) de cada lote da reconstrução
+STATS_REBUILD_CHUNK = int(os.getenv("STATS_REBUILD_CHUNK", "10000"))
+# Perguntas normais por jogador numa partida completa (LIMITE_PERGUNTAS do router de perguntas)
+PERGUNTAS_POR_PARTIDA = 10
+
+
+class PlayerStats(Base):
+    """
+    Agregados por jogador usados na página de perfil.
+    """
+    __tablename__ = "player_stats"
+
+    user_id = Column(Integer, primary_key=True)
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    time_sum = Column(Float, nullable=False, default=0.0)
+    matches_played = Column(Integer, nullable=False, default=0)
+    tournament_wins = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class PlayerStatsMatch(Base):
+    """
+    Partidas já contabilizadas em matches_played (evita contar duas vezes).
+    """
+    __tablename__ = "player_stats_matches"
+
+    match_id = Column(Integer, primary_key=True)
+
+
+def criar_tabelas():
+    PlayerStats.__table__.create(bind=engine, checkfirst=True)
+    PlayerStatsMatch.__table__.create(bind=engine, checkfirst=True)
+
+
+def _somar(db: Session, linhas: list):
+    """
+    Upsert em lote (INSERT ... ON DUPLICATE KEY UPDATE) somando os incrementos.
+    Não faz commit: entra na transação de quem chama.
+    """
+    if not linhas:
+        return
+
+    tabela = PlayerStats.__table__
+    agora = datetime.utcnow()
+    comando = insert(tabela)
+    comando = comando.on_duplicate_key_update(
+        answered=tabela.c.answered + comando.inserted.answered,
+        correct=tabela.c.correct + comando.inserted.correct,
+        time_sum=tabela.c.time_sum + comando.inserted.time_sum,
+        matches_played=tabela.c.matches_played + comando.inserted.matches_played,
+        tournament_wins=tabela.c.tournament_wins + comando.inserted.tournament_wins,
+        updated_at=comando.inserted.updated_at
+    )
+    db.execute(comando, [
+        {
+            "user_id": linha["user_id"],
+            "answered": linha.get("answered", 0),
+            "correct": linha.get("correct", 0),
+            "time_sum": linha.get("time_sum", 0.0),
+            "matches_played": linha.get("matches_played", 0),
+            "tournament_wins": linha.get("tournament_wins", 0),
+            "updated_at": agora
+        }
+        for linha in linhas
+    ])
+
+
+def registrar_respostas(db: Session, respostas: list):
+    """
+    Soma respostas (dicts com user_id, is_correct, time_taken) nas estatísticas.
+    """
+    por_usuario = {}
+    for r in respostas:
+        linha = por_usuario.setdefault(r["user_id"], {"user_id": r["user_id"], "answered": 0, "correct": 0, "time_sum": 0.0})
+        linha["answered"] += 1
+        linha["correct"] += 1 if r["is_correct"] else 0
+        linha["time_sum"] += r["time_taken"] or 0.0
+    _somar(db, list(por_usuario.values()))
+
+
+def registrar_partida(db: Session, match_id: int, user_ids: list):
+    """
+    Conta a partida encerrada para os jogadores, uma única vez por partida.
+    """
+    marcada = db.execute(
+        insert(PlayerStatsMatch.__table__).prefix_with("IGNORE").values(match_id=match_id)
+    ).rowcount
+    if marcada:
+        _somar(db, [{"user_id": uid, "matches_played": 1} for uid in user_ids])
+
+
+def registrar_vitoria_torneio(db: Session, user_id: int):
+    _somar(db, [{"user_id": user_id, "tournament_wins": 1}])
+
+
+def obter_estatisticas(db: Session, user_id: int) -> dict:
+    stats = db.query(PlayerStats).get(user_id)
+    if not stats:
+        stats = PlayerStats(user_id=user_id, answered=0, correct=0, time_sum=0.0, matches_played=0, tournament_wins=0)
+
+    return {
+        "user_id": user_id,
+        "answered": stats.answered,
+        "correct": stats.correct,
+        "accuracy": round(stats.correct / stats.answered, 4) if stats.answered else 0.0,
+        "avg_time_taken": round(stats.time_sum / stats.answered, 2) if stats.answered else None,
+        "matches_played": stats.matches_played,
+        "tournament_wins": stats.tournament_wins
+    }
+
+
+def partidas_encerradas(linhas) -> dict:
+    """
+    Recebe (match_id, user_id, acertos, respondidas) das perguntas normais e retorna
+    {match_id: [user_ids]} das partidas encerradas: todos os jogadores responderam
+    as perguntas da partida e há um único vencedor. Empates seguem para a rodada
+    extra e, como em GET /result, não contam.
+    """
+    partidas = defaultdict(dict)
+    for match_id, user_id, acertos, respondidas in linhas:
+        partidas[match_id][user_id] = (int(acertos or 0), respondidas)
+
+    encerradas = {}
+    for match_id, jogadores in partidas.items():
+        if any(respondidas < PERGUNTAS_POR_PARTIDA for _, respondidas in jogadores.values()):
+            continue
+        pontos = [acertos for acertos, _ in jogadores.values()]
+        if pontos.count(max(pontos)) == 1:
+            encerradas[match_id] = list(jogadores)
+    return encerradas
+
+
+def _agregar_historico(db: Session, tabela, acumulado: dict):
+    """
+    Percorre a tabela em faixas de match_id: soma as respostas por jogador e conta
+    (e marca em player_stats_matches) só as partidas encerradas.
+    """
+    maior = db.execute(select(func.max(tabela.c.match_id))).scalar() or 0
+    inicio = 0
+    while inicio <= maior:
+        fim = inicio + STATS_REBUILD_CHUNK
+        faixa = (tabela.c.match_id >= inicio) & (tabela.c.match_id < fim)
+
+        linhas = db.execute(
+            select(
+                tabela.c.answered_by_user_id,
+                func.count(),
+                func.sum(case((tabela.c.is_correct == True, 1), else_=0)),
+                func.coalesce(func.sum(tabela.c.time_taken), 0)
+            )
+            .where(faixa, tabela.c.answered_by_user_id.isnot(None))
+            .group_by(tabela.c.answered_by_user_id)
+        )
+        for user_id, respondidas, acertos, tempo in linhas:
+            linha = acumulado[user_id]
+            linha["answered"] += respondidas
+            linha["correct"] += int(acertos or 0)
+            linha["time_sum"] += float(tempo or 0)
+
+        encerradas = partidas_encerradas(db.execute(
+            select(
+                tabela.c.match_id,
+                tabela.c.answered_by_user_id,
+                func.sum(case((tabela.c.is_correct == True, 1), else_=0)),
+                func.count()
+            )
+            .where(faixa, tabela.c.answered_by_user_id.isnot(None), tabela.c.is_extra_round == False)
+            .group_by(tabela.c.match_id, tabela.c.answered_by_user_id)
+        ))
+        for user_ids in encerradas.values():
+            for user_id in user_ids:
+                acumulado[user_id]["matches_played"] += 1
+
+        if encerradas:
+            db.execute(
+                insert(PlayerStatsMatch.__table__).prefix_with("IGNORE"),
+                [{"match_id": match_id} for match_id in encerradas]
+            )
+        db.commit()
+        inicio = fim
+
+
+def reconstruir():
+    """
+    Recalcula player_stats do zero a partir de match_questions (quente e arquivo)
+    e dos torneios finalizados.
+    Não deve rodar com tráfego ao vivo: respostas e partidas registradas depois que
+    a faixa delas foi lida são apagadas pelo DELETE final de player_stats.
+    Partidas ainda em andamento não são marcadas e serão contadas por GET /result.
+    """
+    criar_tabelas()
+    MatchQuestionArchive.__table__.create(bind=engine, checkfirst=True)
+
+    acumulado = defaultdict(lambda: {"answered": 0, "correct": 0, "time_sum": 0.0, "matches_played": 0, "tournament_wins": 0})
+
+    db = SessionLocal()
+    try:
+        db.execute(PlayerStatsMatch.__table__.delete())
+        db.commit()
+
+        _agregar_historico(db, MatchQuestion.__table__, acumulado)
+        _agregar_historico(db, MatchQuestionArchive.__table__, acumulado)
+
+        vitorias = (
+            db.query(Tournament.winner_id, func.count(Tournament.id))
+            .filter(Tournament.status == "finalizado", Tournament.winner_id.isnot(None))
+            .group_by(Tournament.winner_id)
+        )
+        for user_id, total in vitorias:
+            acumulado[user_id]["tournament_wins"] += total
+
+        db.execute(PlayerStats.__table__.delete())
+        linhas = [dict(valores, user_id=user_id) for user_id, valores in acumulado.items()]
+        for i in range(0, len(linhas), 1000):
+            _somar(db, linhas[i:i + 1000])
+        db.commit()
+    finally:
+        db.close()
+
+    return len(acumulado)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estatísticas de jogadores")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="reconstrói player_stats a partir do histórico (rodar com o tráfego parado)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print(f"Estatísticas reconstruídas para {reconstruir()} jogadores")
+    else:
+        parser.print_help()
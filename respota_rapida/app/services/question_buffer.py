@@ -0,0 +1,113 @@
+# app/services/question_buffer.py
+
+import os
+import threading
+from collections import deque
+
+from app.services.llm_resilience import gerar_pergunta_resiliente, pergunta_armazenada
+
+# Quantidade de perguntas geradas antecipadamente e mantidas em memória, por pool
+QUESTION_BUFFER_SIZE = int(os.getenv("QUESTION_BUFFER_SIZE", "20"))
+# Pools pré-aquecidos na inicialização, ex: "historia:facil,ciencias:media,:dificil"
+QUESTION_POOLS = os.getenv("QUESTION_POOLS", "")
+# Categorias aceitas dos clientes, ex: "historia,ciencias". Sem ela, valem as de QUESTION_POOLS.
+# Cada categoria nova vira um pool e chamadas à API, então não se aceita texto livre.
+QUESTION_CATEGORIES = os.getenv("QUESTION_CATEGORIES", "")
+TAMANHO_MAX_CATEGORIA = 50  # mesmo tamanho de QuestionProfile.category
+
+CATEGORIAS = frozenset(
+    categoria for categoria in (
+        (item.strip() for item in QUESTION_CATEGORIES.split(",")) if QUESTION_CATEGORIES
+        else (item.strip().partition(":")[0] for item in QUESTION_POOLS.split(","))
+    )
+    if categoria and len(categoria) <= TAMANHO_MAX_CATEGORIA
+)
+
+# Um buffer por (categoria, dificuldade); (None, None) é o pool de conhecimentos gerais
+_buffers = {}
+_reabastecendo = set()
+_lock = threading.Lock()
+
+
+def _reabastecer(pool):
+    """
+    Gera perguntas até completar o buffer do pool. Roda em thread separada para não
+    segurar a requisição que disparou o reabastecimento.
+    """
+    categoria, dificuldade = pool
+    try:
+        while True:
+            with _lock:
+                if len(_buffers[pool]) >= QUESTION_BUFFER_SIZE:
+                    break
+            pergunta = gerar_pergunta_resiliente(categoria, dificuldade)
+            if not pergunta:
+                break
+            with _lock:
+                _buffers[pool].append(pergunta)
+    finally:
+        with _lock:
+            _reabastecendo.discard(pool)
+
+
+def categoria_permitida(categoria) -> bool:
+    """
+    None é o pool de conhecimentos gerais; as demais precisam estar configuradas.
+    """
+    return categoria is None or categoria in CATEGORIAS
+
+
+def agendar_reabastecimento(categoria=None, dificuldade=None):
+    """
+    Dispara o reabastecimento do pool em background se ainda não houver um em andamento.
+    """
+    if not categoria_permitida(categoria):
+        return
+    pool = (categoria, dificuldade)
+    with _lock:
+        buffer = _buffers.setdefault(pool, deque())
+        if pool in _reabastecendo or len(buffer) >= QUESTION_BUFFER_SIZE:
+            return
+        _reabastecendo.add(pool)
+    threading.Thread(target=_reabastecer, args=(pool,), daemon=True).start()
+
+
+def aquecer_pools():
+    """
+    Começa a encher os pools configurados em QUESTION_POOLS e o pool geral.
+    """
+    agendar_reabastecimento()
+    for item in filter(None, (p.strip() for p in QUESTION_POOLS.split(","))):
+        categoria, _, dificuldade = item.partition(":")
+        agendar_reabastecimento(categoria or None, dificuldade or None)
+
+
+def retirar_do_pool(categoria=None, dificuldade=None):
+    """
+    Retira uma pergunta já pronta do pool, sem nunca chamar a API.
+    Retorna None se o pool estiver vazio. Sempre agenda o reabastecimento.
+    """
+    if not categoria_permitida(categoria):
+        raise ValueError("Categoria não permitida")
+    pool = (categoria, dificuldade)
+    with _lock:
+        buffer = _buffers.get(pool)
+        pergunta = buffer.popleft() if buffer else None
+
+    agendar_reabastecimento(categoria, dificuldade)
+    return pergunta
+
+
+def reservar_pergunta(db=None, categoria=None, dificuldade=None, match_id=None):
+    """
+    Retira uma pergunta do pool da categoria/dificuldade. Se estiver vazio, gera na hora.
+    Se o provedor estiver degradado e houver sessão, reaproveita uma pergunta do banco
+    que ainda não tenha sido usada na partida.
+    Sempre agenda o reabastecimento para a próxima chamada.
+    """
+    pergunta = retirar_do_pool(categoria, dificuldade)
+    if pergunta is None:
+        pergunta = gerar_pergunta_resiliente(categoria, dificuldade)
+    if pergunta is None and db is not None:
+        pergunta = pergunta_armazenada(db, categoria, dificuldade, match_id)
+    return pergunta
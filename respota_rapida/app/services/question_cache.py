@@ -0,0 +1,93 @@
+# app/services/question_cache.py
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da stdlib
+    orjson = None
+
+# Quantidade máxima de perguntas serializadas mantidas em memória
+QUESTION_CACHE_MAX = int(os.getenv("QUESTION_CACHE_MAX", "5000"))
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def dumps(payload) -> bytes:
+    """
+    Serializa o payload em bytes JSON, usando orjson quando disponível.
+    Chaves não-string (ex: user_id em pontuacoes) viram string, como no json da stdlib.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _guardar(question_id: int, payload: bytes):
+    with _lock:
+        _cache[question_id] = payload
+        _cache.move_to_end(question_id)
+        while len(_cache) > QUESTION_CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def obter_pergunta_serializada(question_id: int):
+    """
+    Retorna os bytes já serializados da pergunta ou None se não estiver em cache.
+    """
+    with _lock:
+        payload = _cache.get(question_id)
+        if payload is not None:
+            _cache.move_to_end(question_id)
+        return payload
+
+
+def serializar_question_db(question_db, options=None) -> bytes:
+    """
+    Payload da pergunta (question_id, question, options, tip) a partir da linha Question.
+    Se já estiver em cache é só cópia de bytes; senão serializa uma vez e guarda.
+    options já decodificadas podem ser passadas para evitar o json.loads da coluna.
+    """
+    payload = obter_pergunta_serializada(question_db.id)
+    if payload is not None:
+        return payload
+
+    if options is None:
+        options = question_db.options
+        if isinstance(options, (str, bytes)):
+            options = json.loads(options)
+
+    payload = dumps({
+        "question_id": question_db.id,
+        "question": question_db.question_text,
+        "options": options,
+        "tip": question_db.tip
+    })
+    _guardar(question_db.id, payload)
+    return payload
+
+
+def anexar_campos(payload: bytes, campos: dict) -> bytes:
+    """
+    Acrescenta campos a um objeto JSON já serializado sem decodificá-lo.
+    """
+    if not campos:
+        return payload
+    extras = dumps(campos)[1:]
+    return payload[:-1] + (extras if payload == b"{}" else b"," + extras)
+
+
+def incorporar(base: dict, fragmentos: dict) -> bytes:
+    """
+    Serializa base e inclui os fragmentos (bytes JSON prontos) como campos,
+    sem passar de novo pelo encoder.
+    """
+    corpo = dumps(base)
+    if not fragmentos:
+        return corpo
+    extras = b",".join(dumps(chave) + b":" + valor for chave, valor in fragmentos.items())
+    return corpo[:-1] + (extras if corpo == b"{}" else b"," + extras) + b"}"
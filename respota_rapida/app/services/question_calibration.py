@@ -0,0 +1,178 @@
+# app/services/question_calibration.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, String, Float, func, case
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.orm import Session
+
+from app.config import Base, SessionLocal, engine
+from app.models import MatchQuestion
+from app.services.timing_service import LIMITE_PADRAO, LIMITE_TEMPO_MAXIMO
+
+# Intervalo entre rodadas de calibração e mínimo de respostas para recalibrar
+CALIBRATION_INTERVAL = float(os.getenv("CALIBRATION_INTERVAL", "60"))
+CALIBRATION_MIN_ANSWERS = int(os.getenv("CALIBRATION_MIN_ANSWERS", "5"))
+# Folga (segundos) além do maior limite de tempo antes de considerar expirada
+# uma pergunta enviada e ainda sem resposta
+CALIBRATION_DELAY = float(os.getenv("CALIBRATION_DELAY", "60"))
+CALIBRATION_BATCH = int(os.getenv("CALIBRATION_BATCH", "5000"))
+
+CATEGORIA_PADRAO = "geral"
+DIFICULDADE_PADRAO = "media"
+
+
+class QuestionProfile(Base):
+    """
+    Categoria, dificuldade e agregados de desempenho de cada pergunta (1:1 com questions).
+    """
+    __tablename__ = "question_profiles"
+
+    question_id = Column(Integer, primary_key=True)  # mesmo id de Question
+    category = Column(String(50), nullable=False, default=CATEGORIA_PADRAO, index=True)
+    requested_difficulty = Column(String(10), nullable=True)
+    difficulty = Column(String(10), nullable=False, default=DIFICULDADE_PADRAO, index=True)
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    time_sum = Column(Float, nullable=False, default=0.0)
+
+
+class CalibrationCursor(Base):
+    """
+    Último MatchQuestion.id já agregado pela calibração.
+    """
+    __tablename__ = "calibration_cursor"
+
+    id = Column(Integer, primary_key=True)
+    last_match_question_id = Column(Integer, nullable=False, default=0)
+
+
+def registrar_perfil(db: Session, question_id: int, categoria: str = None, dificuldade: str = None):
+    """
+    Cria o perfil da pergunta recém-salva com a categoria e a dificuldade pedidas.
+    """
+    db.add(QuestionProfile(
+        question_id=question_id,
+        category=categoria or CATEGORIA_PADRAO,
+        requested_difficulty=dificuldade,
+        difficulty=dificuldade or DIFICULDADE_PADRAO,
+        answered=0,
+        correct=0,
+        time_sum=0.0
+    ))
+
+
+def dificuldade_calibrada(respondidas: int, acertos: int, tempo_total: float, atual: str) -> str:
+    """
+    Classifica pela taxa de acerto, penalizada por respostas lentas.
+    """
+    if respondidas < CALIBRATION_MIN_ANSWERS:
+        return atual
+
+    taxa = acertos / respondidas
+    tempo_medio = tempo_total / respondidas
+    indice = taxa * (1 - 0.5 * min(tempo_medio / LIMITE_PADRAO, 1))
+
+    if indice >= 0.6:
+        return "facil"
+    if indice < 0.3:
+        return "dificil"
+    return "media"
+
+
+def calibrar(db: Session) -> int:
+    """
+    Agrega um lote de MatchQuestion novos nos perfis e recalcula a dificuldade
+    das perguntas afetadas. Retorna quantas linhas de MatchQuestion foram consumidas.
+    A linha do cursor fica travada (SELECT ... FOR UPDATE) até o commit, então
+    workers concorrentes esperam e nunca agregam o mesmo lote duas vezes.
+    """
+    cursor = db.query(CalibrationCursor).filter_by(id=1).with_for_update().one()
+
+    # Avança apenas pelo prefixo de linhas que não mudam mais: respondidas, ou
+    # enviadas há mais que o maior limite de tempo configurável (expiradas)
+    corte = datetime.utcnow() - timedelta(seconds=LIMITE_TEMPO_MAXIMO + CALIBRATION_DELAY)
+    linhas = (
+        db.query(MatchQuestion.id, MatchQuestion.sent_at, MatchQuestion.answered_by_user_id)
+        .filter(MatchQuestion.id > cursor.last_match_question_id)
+        .order_by(MatchQuestion.id)
+        .limit(CALIBRATION_BATCH)
+        .all()
+    )
+    ultimo_id, consumidas = None, 0
+    for match_question_id, sent_at, respondida_por in linhas:
+        if respondida_por is None and (sent_at is None or sent_at >= corte):
+            break
+        ultimo_id, consumidas = match_question_id, consumidas + 1
+
+    if ultimo_id is None:
+        db.commit()
+        return 0
+
+    agregados = (
+        db.query(
+            MatchQuestion.question_id,
+            func.count(MatchQuestion.id),
+            func.sum(case((MatchQuestion.is_correct == True, 1), else_=0)),
+            func.coalesce(func.sum(MatchQuestion.time_taken), 0)
+        )
+        .filter(MatchQuestion.id > cursor.last_match_question_id)
+        .filter(MatchQuestion.id <= ultimo_id)
+        .filter(MatchQuestion.answered_by_user_id.isnot(None))
+        .group_by(MatchQuestion.question_id)
+        .all()
+    )
+
+    perfis = {
+        p.question_id: p
+        for p in db.query(QuestionProfile).filter(
+            QuestionProfile.question_id.in_([a[0] for a in agregados])
+        )
+    }
+
+    for question_id, respondidas, acertos, tempo_total in agregados:
+        perfil = perfis.get(question_id)
+        if perfil is None:
+            perfil = QuestionProfile(question_id=question_id, answered=0, correct=0, time_sum=0.0,
+                                     category=CATEGORIA_PADRAO, difficulty=DIFICULDADE_PADRAO)
+            db.add(perfil)
+        perfil.answered += respondidas
+        perfil.correct += int(acertos or 0)
+        perfil.time_sum += float(tempo_total or 0)
+        perfil.difficulty = dificuldade_calibrada(perfil.answered, perfil.correct, perfil.time_sum, perfil.difficulty)
+
+    cursor.last_match_question_id = ultimo_id
+    db.commit()
+    return consumidas
+
+
+def _loop_calibracao():
+    while True:
+        db = SessionLocal()
+        try:
+            # Consome lotes enquanto houver atraso acumulado
+            while calibrar(db) >= CALIBRATION_BATCH:
+                pass
+        except Exception as e:
+            db.rollback()
+            print("Erro na calibração de perguntas:", e)
+        finally:
+            db.close()
+        time.sleep(CALIBRATION_INTERVAL)
+
+
+def iniciar_calibracao():
+    """
+    Garante as tabelas de perfil e inicia a calibração incremental em background.
+    """
+    QuestionProfile.__table__.create(bind=engine, checkfirst=True)
+    CalibrationCursor.__table__.create(bind=engine, checkfirst=True)
+    # Cria o cursor antes de qualquer worker calibrar, sem conflito entre workers
+    with engine.begin() as conexao:
+        conexao.execute(
+            insert(CalibrationCursor.__table__).prefix_with("IGNORE").values(id=1, last_match_question_id=0)
+        )
+    threading.Thread(target=_loop_calibracao, daemon=True).start()
@@ -0,0 +1,230 @@
+# app/services/state_backend.py
+
+import heapq
+import os
+import queue
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# URL do backend compartilhado (ex: redis://localhost:6379/0). Sem ela, usa memória do processo.
+STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL")
+# Tempo de vida das marcações de resposta (segundos)
+ANSWER_CLAIM_TTL = int(os.getenv("ANSWER_CLAIM_TTL", "3600"))
+
+
+class StateBackend(ABC):
+    """
+    Estado compartilhado entre workers: fila de partidas aguardando adversário,
+    marcação atômica de respostas, contadores e pub/sub.
+    """
+
+    # True quando o estado é visível para todos os workers/nós
+    compartilhado = False
+
+    @abstractmethod
+    def entrar_fila(self, fila: str, valor: str):
+        """Acrescenta o valor no fim da fila."""
+
+    @abstractmethod
+    def devolver_fila(self, fila: str, valor: str):
+        """Devolve o valor para o início da fila (ex: após falha de quem o retirou)."""
+
+    @abstractmethod
+    def sair_fila(self, fila: str):
+        """Retira atomicamente o primeiro valor da fila ou None."""
+
+    @abstractmethod
+    def remover_fila(self, fila: str, valor: str):
+        """Remove o valor da fila, onde quer que esteja."""
+
+    @abstractmethod
+    def marcar(self, chave: str, valor: str, ttl: int = ANSWER_CLAIM_TTL) -> bool:
+        """Grava chave só se ainda não existir. True para quem marcou primeiro."""
+
+    @abstractmethod
+    def ler(self, chave: str):
+        """Valor da chave ou None."""
+
+    @abstractmethod
+    def apagar(self, chave: str):
+        """Remove a chave."""
+
+    @abstractmethod
+    def incrementar(self, chave: str, valor: int = 1) -> int:
+        """Soma valor ao contador e retorna o total."""
+
+    @abstractmethod
+    def publicar(self, canal: str, mensagem: str):
+        """Envia a mensagem para os assinantes do canal."""
+
+    @abstractmethod
+    def assinar(self, canal: str):
+        """Retorna um iterador bloqueante com as mensagens publicadas no canal."""
+
+
+class MemoryBackend(StateBackend):
+    """
+    Implementação em memória. Só é compartilhada entre threads do mesmo processo.
+    """
+
+    def __init__(self):
+        self._filas = {}
+        self._chaves = {}
+        self._expiracoes = []  # heap de (expira_em, chave) para varrer chaves vencidas
+        self._assinantes = {}
+        self._lock = threading.Lock()
+
+    def _ausente(self, chave):
+        # Considera ausente a chave inexistente ou com TTL vencido (e a remove)
+        item = self._chaves.get(chave)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._chaves[chave]
+            return True
+        return item is None
+
+    def _varrer(self, agora):
+        # Marcações de resposta não são relidas depois de vencer: remove as vencidas
+        while self._expiracoes and self._expiracoes[0][0] <= agora:
+            expira, chave = heapq.heappop(self._expiracoes)
+            item = self._chaves.get(chave)
+            if item is not None and item[1] == expira:  # ignora entradas de chaves já regravadas
+                del self._chaves[chave]
+
+    def entrar_fila(self, fila, valor):
+        with self._lock:
+            self._filas.setdefault(fila, deque()).append(valor)
+
+    def devolver_fila(self, fila, valor):
+        with self._lock:
+            self._filas.setdefault(fila, deque()).appendleft(valor)
+
+    def sair_fila(self, fila):
+        with self._lock:
+            itens = self._filas.get(fila)
+            return itens.popleft() if itens else None
+
+    def remover_fila(self, fila, valor):
+        with self._lock:
+            itens = self._filas.get(fila)
+            if itens and valor in itens:
+                itens.remove(valor)
+
+    def marcar(self, chave, valor, ttl=ANSWER_CLAIM_TTL):
+        with self._lock:
+            agora = time.monotonic()
+            self._varrer(agora)
+            if not self._ausente(chave):
+                return False
+            expira = agora + ttl if ttl else None
+            self._chaves[chave] = (valor, expira)
+            if expira is not None:
+                heapq.heappush(self._expiracoes, (expira, chave))
+            return True
+
+    def ler(self, chave):
+        with self._lock:
+            if self._ausente(chave):
+                return None
+            return self._chaves[chave][0]
+
+    def apagar(self, chave):
+        with self._lock:
+            self._chaves.pop(chave, None)
+
+    def incrementar(self, chave, valor=1):
+        with self._lock:
+            atual = 0 if self._ausente(chave) else int(self._chaves[chave][0])
+            self._chaves[chave] = (str(atual + valor), None)
+            return atual + valor
+
+    def publicar(self, canal, mensagem):
+        with self._lock:
+            assinantes = list(self._assinantes.get(canal, []))
+        for fila in assinantes:
+            fila.put(mensagem)
+
+    def assinar(self, canal):
+        fila = queue.Queue()
+        with self._lock:
+            self._assinantes.setdefault(canal, []).append(fila)
+        try:
+            while True:
+                yield fila.get()
+        finally:
+            with self._lock:
+                self._assinantes[canal].remove(fila)
+
+
+class RedisBackend(StateBackend):
+    """
+    Implementação sobre o protocolo Redis. Funciona com Redis ou qualquer
+    servidor compatível (ex: scripts/fake_redis_server.py em testes).
+    """
+
+    compartilhado = True
+
+    def __init__(self, url: str):
+        import redis  # dependência opcional, só necessária com STATE_BACKEND_URL
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def entrar_fila(self, fila, valor):
+        self._redis.rpush(fila, valor)
+
+    def devolver_fila(self, fila, valor):
+        self._redis.lpush(fila, valor)
+
+    def sair_fila(self, fila):
+        return self._redis.lpop(fila)
+
+    def remover_fila(self, fila, valor):
+        self._redis.lrem(fila, 0, valor)
+
+    def marcar(self, chave, valor, ttl=ANSWER_CLAIM_TTL):
+        return bool(self._redis.set(chave, valor, nx=True, ex=ttl or None))
+
+    def ler(self, chave):
+        return self._redis.get(chave)
+
+    def apagar(self, chave):
+        self._redis.delete(chave)
+
+    def incrementar(self, chave, valor=1):
+        return self._redis.incrby(chave, valor)
+
+    def publicar(self, canal, mensagem):
+        self._redis.publish(canal, mensagem)
+
+    def assinar(self, canal):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(canal)
+        try:
+            for mensagem in pubsub.listen():
+                yield mensagem["data"]
+        finally:
+            pubsub.close()
+
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_backend() -> StateBackend:
+    """
+    Backend configurado para o processo (criado na primeira chamada).
+    """
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = RedisBackend(STATE_BACKEND_URL) if STATE_BACKEND_URL else MemoryBackend()
+        return _backend
+
+
+def chave_resposta(match_id: int, question_id: int) -> str:
+    return f"answer:{match_id}:{question_id}"
@@ -0,0 +1,170 @@
+# app/services/timing_service.py
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, Integer, Float
+from sqlalchemy.orm import Session
+
+from app.config import Base, engine
+from app.services import metrics
+
+load_dotenv()
+
+# Limites de tempo (segundos) para rodadas normais e extras
+LIMITE_PADRAO = float(os.getenv("ANSWER_TIME_LIMIT", "10"))
+LIMITE_RODADA_EXTRA = float(os.getenv("ANSWER_TIME_LIMIT_EXTRA", str(LIMITE_PADRAO)))
+# Maior limite que uma partida pode configurar (PUT /match/{id}/time-limit)
+LIMITE_TEMPO_MAXIMO = 300
+
+# Segredo compartilhado entre workers para assinar os tokens de resposta.
+# Sem ele cada processo geraria o seu e um token só valeria no worker que o emitiu,
+# então com vários workers ele é obrigatório.
+ANSWER_TOKEN_SECRET = os.getenv("ANSWER_TOKEN_SECRET")
+if not ANSWER_TOKEN_SECRET and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    raise RuntimeError("ANSWER_TOKEN_SECRET é obrigatório com mais de um worker (WEB_CONCURRENCY > 1).")
+_SEGREDO = (ANSWER_TOKEN_SECRET or secrets.token_hex(32)).encode("utf-8")
+
+# Registro local (monotônico) do momento de entrega de cada pergunta
+MAX_ENVIOS = int(os.getenv("ANSWER_TIMING_MAX_ENTRIES", "100000"))
+# Por quanto tempo (segundos) cada worker reaproveita o limite lido do banco
+LIMITE_CACHE_TTL = float(os.getenv("ANSWER_TIME_LIMIT_CACHE_TTL", "30"))
+_envios = OrderedDict()
+_limites_partida = OrderedDict()
+_lock = threading.Lock()
+
+
+class MatchTimeLimit(Base):
+    """
+    Limites de tempo configurados para uma partida (nulo = padrão do servidor).
+    """
+    __tablename__ = "match_time_limits"
+
+    match_id = Column(Integer, primary_key=True)
+    limit_seconds = Column(Float, nullable=True)
+    extra_round_limit_seconds = Column(Float, nullable=True)
+
+
+def criar_tabelas():
+    MatchTimeLimit.__table__.create(bind=engine, checkfirst=True)
+
+
+def _guardar_limites(match_id: int, normal, extra):
+    with _lock:
+        _limites_partida[match_id] = (normal, extra, time.monotonic() + LIMITE_CACHE_TTL)
+        _limites_partida.move_to_end(match_id)
+        while len(_limites_partida) > MAX_ENVIOS:
+            _limites_partida.popitem(last=False)
+
+
+def definir_limite_partida(db: Session, match_id: int, segundos: float = None, segundos_rodada_extra: float = None):
+    """
+    Grava os limites da partida no banco, visíveis para todos os workers.
+    Os outros workers passam a usá-los quando o cache local expirar.
+    """
+    db.merge(MatchTimeLimit(
+        match_id=match_id,
+        limit_seconds=segundos,
+        extra_round_limit_seconds=segundos_rodada_extra
+    ))
+    db.commit()
+    _guardar_limites(match_id, segundos, segundos_rodada_extra)
+
+
+def limite_para(match_id: int, is_extra_round: bool = False, db: Session = None) -> float:
+    """
+    Limite de tempo da partida/rodada: valor configurado para a partida, se houver, senão o padrão.
+    Sem sessão, usa apenas o que já estiver no cache local.
+    """
+    with _lock:
+        item = _limites_partida.get(match_id)
+    if (item is None or item[2] <= time.monotonic()) and db is not None:
+        config = db.query(MatchTimeLimit).get(match_id)
+        item = (config.limit_seconds, config.extra_round_limit_seconds) if config else (None, None)
+        _guardar_limites(match_id, *item)
+
+    normal, extra = item[:2] if item else (None, None)
+    if is_extra_round:
+        return extra if extra is not None else LIMITE_RODADA_EXTRA
+    return normal if normal is not None else LIMITE_PADRAO
+
+
+def _assinar(mensagem: str) -> str:
+    return hmac.new(_SEGREDO, mensagem.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def emitir_token(match_id: int, question_id: int, limite: float) -> str:
+    """
+    Gera o token assinado que acompanha a pergunta entregue.
+    Carrega o instante de emissão e o limite (ambos em ms), então qualquer worker consegue validá-lo.
+    """
+    emitido_ms = int(time.time() * 1000)
+    mensagem = f"{match_id}.{question_id}.{emitido_ms}.{int(limite * 1000)}"
+    return f"{mensagem}.{_assinar(mensagem)}"
+
+
+def marcar_envio(match_id: int, question_id: int):
+    """
+    Registra no relógio monotônico o momento em que a resposta saiu para o cliente.
+    Deve rodar como tarefa de background, que só executa após o envio.
+    """
+    with _lock:
+        _envios[(match_id, question_id)] = time.monotonic()
+        while len(_envios) > MAX_ENVIOS:
+            _envios.popitem(last=False)
+
+
+def _ler_token(token: str, match_id: int, question_id: int):
+    partes = token.split(".")
+    if len(partes) != 5:
+        raise ValueError("Token de resposta inválido")
+
+    mensagem, assinatura = ".".join(partes[:4]), partes[4]
+    # Compara bytes: compare_digest recusa str com caracteres não ASCII
+    if not hmac.compare_digest(assinatura.encode("utf-8"), _assinar(mensagem).encode("utf-8")):
+        raise ValueError("Token de resposta inválido")
+
+    if int(partes[0]) != match_id or int(partes[1]) != question_id:
+        raise ValueError("Token não pertence a esta pergunta")
+
+    return int(partes[2]) / 1000, int(partes[3]) / 1000
+
+
+def medir_tempo(match_id: int, question_id: int, token=None, sent_at=None,
+                is_extra_round: bool = False, db: Session = None):
+    """
+    Calcula o tempo de resposta e o limite aplicável.
+    Ordem de preferência: relógio monotônico local, token assinado e, por último, sent_at do banco.
+    Retorna (tempo_decorrido, limite, fonte).
+    """
+    if token:
+        emitido, limite = _ler_token(token, match_id, question_id)
+    else:
+        limite = limite_para(match_id, is_extra_round, db)
+
+    # Só consome o registro monotônico depois do token validado
+    with _lock:
+        enviado_mono = _envios.pop((match_id, question_id), None)
+
+    if enviado_mono is not None:
+        tempo, fonte = time.monotonic() - enviado_mono, "monotonic"
+    elif token:
+        tempo, fonte = time.time() - emitido, "token"
+    elif sent_at is not None:
+        tempo, fonte = (datetime.utcnow() - sent_at).total_seconds(), "sent_at"
+    else:
+        raise ValueError("Timestamp de envio da pergunta não definido")
+
+    metrics.incrementar(f"answer_timing_source_{fonte}")
+    # Diferença entre o tempo medido e o que o sent_at do banco indicaria
+    if fonte != "sent_at" and sent_at is not None:
+        metrics.registrar("answer_timing_drift_seconds", (datetime.utcnow() - sent_at).total_seconds() - tempo)
+
+    return max(tempo, 0.0), limite, fonte
@@ -1,10 +1,20 @@
 # app/services/tournament_service.py
 
+import json
+import os
+
+from sqlalchemy import Column, Integer, String, LargeBinary, UniqueConstraint, func
 from sqlalchemy.orm import Session
-from app.models import Tournament, TournamentMatch, Match, User
+from app.config import Base, SessionLocal, engine
+from app.models import Tournament, TournamentMatch, Match, MatchPlayer, User
+from app.services.bracket import Chave, parear_suico, rodadas_suico
+from app.services.player_stats import registrar_vitoria_torneio
 from datetime import datetime
 from typing import List
 
+# Maior torneio aceito (a chave aloca 2 x próxima potência de 2 posições)
+TOURNAMENT_MAX_PLAYERS = int(os.getenv("TOURNAMENT_MAX_PLAYERS", "4096"))
+
 def set_match_winner(db: Session, tournament_match_id: int, winner_user_id: int):
     """
     Atualiza o vencedor da partida no torneio,
@@ -39,6 +49,7 @@ def set_match_winner(db: Session, tournament_match_id: int, winner_user_id: int)
     if len(all_matches_round) == 1:
         tournament.status = "finalizado"
         tournament.winner_id = all_matches_round[0].winner_id
+        registrar_vitoria_torneio(db, tournament.winner_id)
         db.commit()
         return f"Torneio finalizado. Campeão: usuário {tournament.winner_id}"
 
@@ -91,3 +102,364 @@ def montar_proxima_rodada(db: Session, tournament: Tournament, round_number: int
         )
         db.add(tm)
     db.commit()
+
+
+# ────────────────────────────────
+# TORNEIOS EM LARGA ESCALA
+# Vários torneios simultâneos, seeds, byes, formato suíço e chave em árvore sobre arrays.
+# ────────────────────────────────
+
+class TournamentEntry(Base):
+    """
+    Inscrição de um jogador em um torneio, com o rating usado para os seeds.
+    """
+    __tablename__ = "tournament_entries"
+    __table_args__ = (UniqueConstraint("tournament_id", "user_id", name="uq_tournament_entry"),)
+
+    id = Column(Integer, primary_key=True)
+    tournament_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    rating = Column(Integer, nullable=False, default=0)
+
+
+class TournamentBracket(Base):
+    """
+    Configuração e estado compacto do torneio: a chave eliminatória fica serializada
+    em dois arrays (vencedores e partidas por nó), sem uma linha por nó.
+    """
+    __tablename__ = "tournament_brackets"
+
+    tournament_id = Column(Integer, primary_key=True)
+    format = Column(String(20), nullable=False, default="eliminatorio")
+    capacity = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False, default=0)
+    current_round = Column(Integer, nullable=False, default=0)
+    total_rounds = Column(Integer, nullable=False, default=0)
+    winners = Column(LargeBinary(length=2 ** 24), nullable=True)
+    matches = Column(LargeBinary(length=2 ** 24), nullable=True)
+
+
+class TournamentBracketMatch(Base):
+    """
+    Nó da chave decidido por cada TournamentMatch (busca O(1) pela chave primária).
+    """
+    __tablename__ = "tournament_bracket_matches"
+
+    tournament_match_id = Column(Integer, primary_key=True)
+    tournament_id = Column(Integer, nullable=False, index=True)
+    node = Column(Integer, nullable=False)
+
+
+FORMATOS = ("eliminatorio", "suico")
+
+
+def criar_tabelas():
+    for tabela in (TournamentEntry, TournamentBracket, TournamentBracketMatch):
+        tabela.__table__.create(bind=engine, checkfirst=True)
+
+
+def _criar_partida(db: Session, tournament: Tournament, rodada: int, player1: int, player2, no: int = None):
+    """
+    Cria Match, MatchPlayers e TournamentMatch numa só transação (sem commit).
+    player2 None representa bye no formato suíço.
+    """
+    match = Match()
+    db.add(match)
+    db.flush()
+
+    db.add(MatchPlayer(match_id=match.id, user_id=player1, status="playing"))
+    if player2:
+        db.add(MatchPlayer(match_id=match.id, user_id=player2, status="playing"))
+
+    tm = TournamentMatch(
+        tournament_id=tournament.id,
+        match_id=match.id,
+        round_number=rodada,
+        player1_id=player1,
+        player2_id=player2
+    )
+    db.add(tm)
+    db.flush()
+
+    if no is not None:
+        db.add(TournamentBracketMatch(tournament_match_id=tm.id, tournament_id=tournament.id, node=no))
+    return tm
+
+
+def _jogadores_por_seed(db: Session, tournament_id: int) -> list:
+    linhas = (
+        db.query(TournamentEntry.user_id)
+        .filter(TournamentEntry.tournament_id == tournament_id)
+        .order_by(TournamentEntry.rating.desc(), TournamentEntry.id)
+    )
+    return [linha[0] for linha in linhas]
+
+
+def rating_jogador(db: Session, user_id: int) -> int:
+    """
+    Rating usado nos seeds, calculado no servidor a partir das vitórias do jogador.
+    """
+    user = db.query(User).get(user_id)
+    return (user.vitorias or 0) if user else 0
+
+
+def inscrever(db: Session, user_id: int, tournament_id: int = None, capacidade: int = 4,
+              formato: str = "eliminatorio"):
+    """
+    Inscreve o jogador no torneio informado ou no primeiro aberto com o mesmo
+    formato e capacidade (criando um novo se não houver). Inicia o torneio ao lotar.
+    Retorna (tournament, inscritos, iniciado).
+    """
+    if tournament_id is not None:
+        bracket = (
+            db.query(TournamentBracket)
+            .filter(TournamentBracket.tournament_id == tournament_id)
+            .with_for_update()
+            .first()
+        )
+        if not bracket:
+            raise ValueError("Torneio não encontrado")
+    else:
+        bracket = (
+            db.query(TournamentBracket)
+            .join(Tournament, Tournament.id == TournamentBracket.tournament_id)
+            .filter(
+                Tournament.status == "esperando",
+                TournamentBracket.format == formato,
+                TournamentBracket.capacity == capacidade
+            )
+            .order_by(TournamentBracket.tournament_id)
+            .with_for_update()
+            .first()
+        )
+        if not bracket:
+            tournament = Tournament(status="esperando", tipo=formato)
+            db.add(tournament)
+            db.flush()
+            bracket = TournamentBracket(tournament_id=tournament.id, format=formato, capacity=capacidade)
+            db.add(bracket)
+
+    tournament = db.query(Tournament).get(bracket.tournament_id)
+    if tournament.status != "esperando":
+        raise ValueError("Inscrições encerradas para este torneio")
+
+    ja_inscrito = db.query(TournamentEntry.id).filter_by(tournament_id=tournament.id, user_id=user_id).first()
+    if ja_inscrito:
+        raise ValueError("Usuário já inscrito no torneio")
+
+    db.add(TournamentEntry(tournament_id=tournament.id, user_id=user_id, rating=rating_jogador(db, user_id)))
+    db.flush()
+
+    inscritos = db.query(func.count(TournamentEntry.id)).filter(TournamentEntry.tournament_id == tournament.id).scalar()
+    iniciado = inscritos >= bracket.capacity
+    if iniciado:
+        iniciar_torneio(db, tournament, bracket)
+
+    db.commit()
+    return tournament, inscritos, iniciado
+
+
+def iniciar_torneio(db: Session, tournament: Tournament, bracket: TournamentBracket):
+    """
+    Monta a primeira rodada: chave com seeds e byes (eliminatório) ou pareamento suíço.
+    """
+    jogadores = _jogadores_por_seed(db, tournament.id)
+
+    if bracket.format == "suico":
+        bracket.total_rounds = rodadas_suico(len(jogadores))
+        _rodada_suica(db, tournament, bracket, 1, jogadores)
+    else:
+        chave = Chave.criar(jogadores)
+        for no in chave.prontos():
+            tm = _criar_partida(db, tournament, chave.rodada(no), *chave.filhos(no), no=no)
+            chave.partidas[no] = tm.id
+        bracket.size = chave.tamanho
+        bracket.total_rounds = chave.total_rodadas
+        bracket.current_round = 1
+        bracket.winners, bracket.matches = chave.serializar()
+
+    tournament.status = "em_andamento"
+
+
+def _classificacao_suica(db: Session, tournament_id: int, jogadores: list) -> list:
+    vitorias = dict(
+        db.query(TournamentMatch.winner_id, func.count(TournamentMatch.id))
+        .filter(TournamentMatch.tournament_id == tournament_id, TournamentMatch.winner_id.isnot(None))
+        .group_by(TournamentMatch.winner_id)
+    )
+    ordem = {uid: i for i, uid in enumerate(jogadores)}
+    return sorted(jogadores, key=lambda uid: (-vitorias.get(uid, 0), ordem[uid]))
+
+
+def _rodada_suica(db: Session, tournament: Tournament, bracket: TournamentBracket, rodada: int, jogadores: list):
+    confrontos, ja_tiveram_bye = set(), set()
+    for player1, player2 in db.query(TournamentMatch.player1_id, TournamentMatch.player2_id).filter(
+        TournamentMatch.tournament_id == tournament.id
+    ):
+        if player2 is None:
+            ja_tiveram_bye.add(player1)
+        else:
+            confrontos.add(frozenset((player1, player2)))
+
+    classificacao = _classificacao_suica(db, tournament.id, jogadores)
+    pares, bye = parear_suico(classificacao, confrontos, ja_tiveram_bye)
+
+    for player1, player2 in pares:
+        _criar_partida(db, tournament, rodada, player1, player2)
+    if bye is not None:
+        # Bye vale como vitória na rodada
+        tm = _criar_partida(db, tournament, rodada, bye, None)
+        tm.winner_id = bye
+
+    bracket.current_round = rodada
+
+
+def _finalizar(db: Session, tournament: Tournament, campeao: int) -> str:
+    tournament.status = "finalizado"
+    tournament.winner_id = campeao
+
+    vencedor_torneio = db.query(User).get(campeao)
+    if vencedor_torneio:
+        vencedor_torneio.vitorias = (vencedor_torneio.vitorias or 0) + 1
+    registrar_vitoria_torneio(db, campeao)
+    return f"Torneio finalizado! Vencedor: usuário {campeao}."
+
+
+def avancar_chave(db: Session, tmatch: TournamentMatch, winner_user_id: int):
+    """
+    Registra o vencedor em torneios criados com TournamentBracket.
+    Eliminatório: avança só o nó da partida (O(1)) e cria o confronto do nó pai
+    assim que o outro lado estiver decidido, sem esperar a rodada inteira.
+    Suíço: pareia a próxima rodada quando a atual termina.
+    Retorna None para torneios antigos, que seguem o fluxo por rodada completa.
+    """
+    bracket = (
+        db.query(TournamentBracket)
+        .filter(TournamentBracket.tournament_id == tmatch.tournament_id)
+        .with_for_update()
+        .first()
+    )
+    if not bracket:
+        return None
+
+    db.refresh(tmatch)
+    if tmatch.winner_id is not None:
+        raise ValueError("Partida já tem vencedor definido")
+    if winner_user_id not in (tmatch.player1_id, tmatch.player2_id):
+        raise ValueError("Vencedor informado não é jogador desta partida")
+
+    tournament = db.query(Tournament).get(tmatch.tournament_id)
+    tmatch.winner_id = winner_user_id
+    vencedor = db.query(User).get(winner_user_id)
+    if vencedor:
+        vencedor.vitorias = (vencedor.vitorias or 0) + 1
+
+    if bracket.format == "suico":
+        pendentes = db.query(func.count(TournamentMatch.id)).filter(
+            TournamentMatch.tournament_id == tournament.id,
+            TournamentMatch.round_number == tmatch.round_number,
+            TournamentMatch.winner_id.is_(None),
+            TournamentMatch.id != tmatch.id
+        ).scalar()
+        jogadores = None
+        if pendentes:
+            mensagem = f"Vencedor registrado. Aguardando término das outras partidas da rodada {tmatch.round_number}."
+        elif tmatch.round_number >= bracket.total_rounds:
+            db.flush()
+            jogadores = _jogadores_por_seed(db, tournament.id)
+            mensagem = _finalizar(db, tournament, _classificacao_suica(db, tournament.id, jogadores)[0])
+        else:
+            db.flush()
+            jogadores = _jogadores_por_seed(db, tournament.id)
+            _rodada_suica(db, tournament, bracket, tmatch.round_number + 1, jogadores)
+            mensagem = f"Rodada {tmatch.round_number} finalizada. Próxima rodada {tmatch.round_number + 1} iniciada."
+        db.commit()
+        return mensagem
+
+    no = db.query(TournamentBracketMatch.node).filter(
+        TournamentBracketMatch.tournament_match_id == tmatch.id
+    ).scalar()
+    chave = Chave.carregar(bracket.size, bracket.winners, bracket.matches)
+    pai = chave.registrar_vencedor(no, winner_user_id)
+
+    if chave.campeao():
+        mensagem = _finalizar(db, tournament, chave.campeao())
+    elif pai:
+        tm = _criar_partida(db, tournament, chave.rodada(pai), *chave.filhos(pai), no=pai)
+        chave.partidas[pai] = tm.id
+        bracket.current_round = max(bracket.current_round, chave.rodada(pai))
+        mensagem = f"Vencedor registrado. Partida da rodada {chave.rodada(pai)} criada."
+    else:
+        mensagem = "Vencedor registrado. Aguardando adversário da próxima fase."
+
+    bracket.winners, bracket.matches = chave.serializar()
+    db.commit()
+    return mensagem
+
+
+def exportar_chave(db: Session, tournament_id: int, pagina: int = 1, por_pagina: int = 100) -> dict:
+    """
+    Uma página da chave. No eliminatório vem direto dos arrays (nós internos, da final
+    para as primeiras rodadas); no suíço, de uma consulta por colunas, sem objetos ORM.
+    """
+    bracket = db.query(TournamentBracket).get(tournament_id)
+    if not bracket:
+        raise ValueError("Torneio não encontrado")
+
+    inicio = (pagina - 1) * por_pagina
+    dados = {
+        "tournament_id": tournament_id,
+        "format": bracket.format,
+        "current_round": bracket.current_round,
+        "total_rounds": bracket.total_rounds,
+        "page": pagina,
+        "page_size": por_pagina
+    }
+
+    if bracket.format != "suico" and bracket.size:
+        chave = Chave.carregar(bracket.size, bracket.winners, bracket.matches)
+        dados["total"] = chave.tamanho - 1
+        dados["nodes"] = chave.pagina(inicio + 1, por_pagina)
+        return dados
+
+    linhas = (
+        db.query(
+            TournamentMatch.id, TournamentMatch.match_id, TournamentMatch.round_number,
+            TournamentMatch.player1_id, TournamentMatch.player2_id, TournamentMatch.winner_id
+        )
+        .filter(TournamentMatch.tournament_id == tournament_id)
+        .order_by(TournamentMatch.round_number, TournamentMatch.id)
+        .offset(inicio)
+        .limit(por_pagina)
+    )
+    dados["matches"] = [
+        {"tournament_match_id": tm_id, "match_id": match_id, "round": rodada,
+         "player1_id": p1, "player2_id": p2, "winner_id": vencedor}
+        for tm_id, match_id, rodada, p1, p2, vencedor in linhas
+    ]
+    return dados
+
+
+def transmitir_partidas(tournament_id: int, lote: int = 1000):
+    """
+    Gera as partidas do torneio como NDJSON, lendo do banco em lotes (yield_per).
+    Abre a própria sessão porque é consumido depois que a rota retorna.
+    """
+    db = SessionLocal()
+    try:
+        linhas = (
+            db.query(
+                TournamentMatch.id, TournamentMatch.match_id, TournamentMatch.round_number,
+                TournamentMatch.player1_id, TournamentMatch.player2_id, TournamentMatch.winner_id
+            )
+            .filter(TournamentMatch.tournament_id == tournament_id)
+            .order_by(TournamentMatch.round_number, TournamentMatch.id)
+            .yield_per(lote)
+        )
+        for tm_id, match_id, rodada, p1, p2, vencedor in linhas:
+            yield json.dumps({
+                "tournament_match_id": tm_id, "match_id": match_id, "round": rodada,
+                "player1_id": p1, "player2_id": p2, "winner_id": vencedor
+            }) + "\n"
+    finally:
+        db.close()
@@ -0,0 +1,117 @@
+# scripts/bench_answer_log.py
+#
+# Compara respostas/segundo com commit síncrono por resposta x log write-behind
+# (fsync em grupo + UPDATE em lote). Usa SQLite local para não depender do MySQL.
+# O tempo do write-behind inclui o descarregamento final: todas as respostas no banco.
+# Uso:
+#   python scripts/bench_answer_log.py [respostas] [threads]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.answer_log import AnswerLog
+
+CRIAR_TABELA = (
+    "CREATE TABLE match_questions ("
+    " id INTEGER PRIMARY KEY, match_id INTEGER, question_id INTEGER,"
+    " answered_by_user_id INTEGER, selected_option TEXT, time_taken REAL,"
+    " is_correct INTEGER, is_extra_round INTEGER DEFAULT 0)"
+)
+ATUALIZAR = (
+    "UPDATE match_questions SET answered_by_user_id = ?, selected_option = ?,"
+    " time_taken = ?, is_correct = ?"
+    " WHERE match_id = ? AND question_id = ? AND is_extra_round = 0 AND answered_by_user_id IS NULL"
+)
+
+
+def preparar_banco(caminho: str, total: int):
+    conn = sqlite3.connect(caminho, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute(CRIAR_TABELA)
+    conn.execute("CREATE INDEX ix_mq ON match_questions (match_id, question_id)")
+    conn.executemany(
+        "INSERT INTO match_questions (match_id, question_id) VALUES (?, ?)",
+        [(i // 10, i) for i in range(total)]
+    )
+    conn.commit()
+    return conn
+
+
+def resposta(i: int) -> dict:
+    return {
+        "match_id": i // 10,
+        "question_id": i,
+        "user_id": 1,
+        "selected_option": "A",
+        "time_taken": 1.5,
+        "is_correct": True
+    }
+
+
+def parametros(e: dict):
+    return (e["user_id"], e["selected_option"], e["time_taken"], e["is_correct"], e["match_id"], e["question_id"])
+
+
+def rodar_em_threads(total: int, threads: int, funcao) -> float:
+    inicio = time.perf_counter()
+    trabalhadores = [
+        threading.Thread(target=lambda t=t: [funcao(i) for i in range(t, total, threads)])
+        for t in range(threads)
+    ]
+    for w in trabalhadores:
+        w.start()
+    for w in trabalhadores:
+        w.join()
+    return time.perf_counter() - inicio
+
+
+def bench_sincrono(pasta: str, total: int, threads: int) -> float:
+    conn = preparar_banco(os.path.join(pasta, "sync.db"), total)
+    lock = threading.Lock()
+
+    def responder(i):
+        with lock:
+            conn.execute(ATUALIZAR, parametros(resposta(i)))
+            conn.commit()
+
+    return total / rodar_em_threads(total, threads, responder)
+
+
+def bench_write_behind(pasta: str, total: int, threads: int) -> float:
+    conn = preparar_banco(os.path.join(pasta, "wb.db"), total)
+    lock = threading.Lock()
+
+    def persistir(entradas):
+        with lock:
+            conn.executemany(ATUALIZAR, [parametros(e) for e in entradas])
+            conn.commit()
+
+    log = AnswerLog(os.path.join(pasta, "answers.jsonl"), persistir=persistir)
+    log.iniciar()
+    inicio = time.perf_counter()
+    rodar_em_threads(total, threads, lambda i: log.registrar(resposta(i)))
+    log.parar()  # descarrega o que falta no banco
+    tempo = time.perf_counter() - inicio
+
+    gravadas = conn.execute("SELECT COUNT(*) FROM match_questions WHERE answered_by_user_id IS NOT NULL").fetchone()[0]
+    assert gravadas == total, f"esperado {total}, gravadas {gravadas}"
+    return total / tempo
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    with tempfile.TemporaryDirectory() as pasta:
+        sincrono = bench_sincrono(pasta, total, threads)
+        write_behind = bench_write_behind(pasta, total, threads)
+
+    print(f"respostas: {total}, threads: {threads}")
+    print(f"commit síncrono:  {sincrono:10.0f} respostas/s")
+    print(f"write-behind:     {write_behind:10.0f} respostas/s ({write_behind / sincrono:.1f}x)")
@@ -0,0 +1,61 @@
+# scripts/fake_openai_server.py
+#
+# Servidor falso compatível com /v1/chat/completions para testar a camada de resiliência.
+# Uso:
+#   FAKE_LATENCY=3 FAKE_ERROR_RATE=0.3 python scripts/fake_openai_server.py 8089
+#   OPENAI_API_BASE=http://localhost:8089/v1 uvicorn app.main:app
+
+import json
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCIA = float(os.getenv("FAKE_LATENCY", "0"))
+TAXA_ERRO = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+PERGUNTA = {
+    "question": "Qual é a capital da França?",
+    "options": {"A": "Paris", "B": "Roma", "C": "Londres", "D": "Berlim"},
+    "correct_option": "A",
+    "tip": "É uma cidade conhecida como a cidade do amor."
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(tamanho)
+
+        time.sleep(LATENCIA)
+
+        if random.random() < TAXA_ERRO:
+            self._responder(503, {"error": {"message": "falha injetada", "type": "server_error"}})
+            return
+
+        self._responder(200, {
+            "id": "fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-3.5-turbo",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(PERGUNTA, ensure_ascii=False)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        })
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    ThreadingHTTPServer(("0.0.0.0", porta), Handler).serve_forever()
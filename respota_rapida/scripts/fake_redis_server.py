@@ -0,0 +1,219 @@
+# scripts/fake_redis_server.py
+#
+# Stand-in local do protocolo Redis (RESP) com os comandos usados pelo RedisBackend:
+# listas, SET NX EX, GET, DEL, INCRBY e pub/sub, em RESP2 ou RESP3 (HELLO 3).
+# Serve para testar o backend compartilhado sem um Redis de verdade.
+# Uso:
+#   python scripts/fake_redis_server.py 6390
+#   STATE_BACKEND_URL=redis://localhost:6390/0 uvicorn app.main:app --workers 4
+
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+
+class Estado:
+    def __init__(self):
+        self.listas = {}
+        self.chaves = {}  # chave -> (valor, expira_em ou None)
+        self.assinantes = {}  # canal -> set de handlers
+        self.lock = threading.Lock()
+
+    def ler(self, chave):
+        item = self.chaves.get(chave)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self.chaves[chave]
+            return None
+        return item[0] if item else None
+
+
+class Handler(socketserver.StreamRequestHandler):
+    estado = None
+
+    # ---------- protocolo ----------
+
+    def _ler_comando(self):
+        linha = self.rfile.readline()
+        if not linha:
+            return None
+        if not linha.startswith(b"*"):
+            return linha.strip().split()  # comando inline (ex: telnet)
+        partes = []
+        for _ in range(int(linha[1:])):
+            tamanho = int(self.rfile.readline()[1:])
+            partes.append(self.rfile.read(tamanho + 2)[:-2])
+        return partes
+
+    def _enviar(self, valor):
+        self.wfile.write(self._codificar(valor))
+        self.wfile.flush()
+
+    def _codificar(self, valor) -> bytes:
+        if valor is None or valor is False:
+            return b"_\r\n" if self.resp3 else b"$-1\r\n"
+        if valor is True:
+            return b"+OK\r\n"
+        if isinstance(valor, int):
+            return b":%d\r\n" % valor
+        if isinstance(valor, Exception):
+            return b"-ERR %s\r\n" % str(valor).encode("utf-8")
+        if isinstance(valor, dict):
+            prefixo = b"%%%d\r\n" % len(valor) if self.resp3 else b"*%d\r\n" % (2 * len(valor))
+            return prefixo + b"".join(self._codificar(k) + self._codificar(v) for k, v in valor.items())
+        if isinstance(valor, (list, tuple)):
+            return b"*%d\r\n" % len(valor) + b"".join(self._codificar(v) for v in valor)
+        if isinstance(valor, str):
+            valor = valor.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+    def _enviar_push(self, valores: list):
+        # Mensagens de pub/sub: tipo push (>) no RESP3, array comum no RESP2
+        dados = self._codificar(valores)
+        if self.resp3:
+            dados = b">" + dados[1:]
+        with self.lock_envio:
+            self.wfile.write(dados)
+            self.wfile.flush()
+
+    # ---------- comandos ----------
+
+    def handle(self):
+        self.resp3 = False
+        self.canais = set()
+        self.lock_envio = threading.Lock()
+        try:
+            while True:
+                comando = self._ler_comando()
+                if comando is None:
+                    break
+                if not comando:
+                    continue
+                nome, argumentos = comando[0].decode().upper(), comando[1:]
+                metodo = getattr(self, f"cmd_{nome.lower()}", None)
+                try:
+                    resposta = metodo(*argumentos) if metodo else ValueError(f"unknown command '{nome}'")
+                except Exception as e:
+                    resposta = e
+                if resposta is not Ellipsis:  # Ellipsis: o comando já respondeu
+                    with self.lock_envio:
+                        self._enviar(resposta)
+        except ConnectionError:
+            pass
+        finally:
+            with self.estado.lock:
+                for canal in self.canais:
+                    self.estado.assinantes.get(canal, set()).discard(self)
+
+    def cmd_hello(self, *args):
+        versao = int(args[0]) if args else 2
+        if versao not in (2, 3):
+            raise ValueError("NOPROTO unsupported protocol version")
+        self.resp3 = versao == 3
+        return {"server": "redis", "version": "7.0.0", "proto": versao, "id": 1,
+                "mode": "standalone", "role": "master", "modules": []}
+
+    def cmd_ping(self, *args):
+        return args[0] if args else True
+
+    def cmd_select(self, *args):
+        return True
+
+    def cmd_rpush(self, chave, *valores):
+        with self.estado.lock:
+            lista = self.estado.listas.setdefault(chave, deque())
+            lista.extend(valores)
+            return len(lista)
+
+    def cmd_lpush(self, chave, *valores):
+        with self.estado.lock:
+            lista = self.estado.listas.setdefault(chave, deque())
+            lista.extendleft(valores)
+            return len(lista)
+
+    def cmd_lpop(self, chave):
+        with self.estado.lock:
+            lista = self.estado.listas.get(chave)
+            return lista.popleft() if lista else None
+
+    def cmd_lrem(self, chave, quantidade, valor):
+        with self.estado.lock:
+            lista = self.estado.listas.get(chave, deque())
+            antes = len(lista)
+            self.estado.listas[chave] = deque(v for v in lista if v != valor)
+            return antes - len(self.estado.listas[chave])
+
+    def cmd_set(self, chave, valor, *opcoes):
+        opcoes = [o.decode().upper() for o in opcoes]
+        expira = None
+        if "EX" in opcoes:
+            expira = time.monotonic() + int(opcoes[opcoes.index("EX") + 1])
+        with self.estado.lock:
+            if "NX" in opcoes and self.estado.ler(chave) is not None:
+                return None
+            self.estado.chaves[chave] = (valor, expira)
+            return True
+
+    def cmd_get(self, chave):
+        with self.estado.lock:
+            return self.estado.ler(chave)
+
+    def cmd_del(self, *chaves):
+        with self.estado.lock:
+            return sum(1 for chave in chaves if self.estado.chaves.pop(chave, None) is not None)
+
+    def cmd_incrby(self, chave, valor):
+        with self.estado.lock:
+            atual = int(self.estado.ler(chave) or 0) + int(valor)
+            self.estado.chaves[chave] = (str(atual).encode(), None)
+            return atual
+
+    def cmd_publish(self, canal, mensagem):
+        with self.estado.lock:
+            assinantes = list(self.estado.assinantes.get(canal, ()))
+        for handler in assinantes:
+            handler._enviar_push([b"message", canal, mensagem])
+        return len(assinantes)
+
+    def cmd_subscribe(self, *canais):
+        for canal in canais:
+            with self.estado.lock:
+                self.estado.assinantes.setdefault(canal, set()).add(self)
+            self.canais.add(canal)
+            self._enviar_push([b"subscribe", canal, len(self.canais)])
+        return Ellipsis
+
+    def cmd_unsubscribe(self, *canais):
+        for canal in canais or list(self.canais):
+            with self.estado.lock:
+                self.estado.assinantes.get(canal, set()).discard(self)
+            self.canais.discard(canal)
+            self._enviar_push([b"unsubscribe", canal, len(self.canais)])
+        return Ellipsis
+
+
+class Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def iniciar(porta: int = 0) -> Servidor:
+    """
+    Sobe o servidor em background (porta 0 = porta livre) e o retorna.
+    A porta usada fica em servidor.server_address[1].
+    """
+    handler = type("HandlerComEstado", (Handler,), {"estado": Estado()})
+    servidor = Servidor(("127.0.0.1", porta), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 6390
+    servidor = iniciar(porta)
+    print(f"Redis falso ouvindo em 127.0.0.1:{porta}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
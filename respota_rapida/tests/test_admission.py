@@ -0,0 +1,14 @@
+from app.services import admission
+from app.services.admission import LimiteUsuario, permitir_prefetch
+
+
+def test_answer_nao_passa_pela_admissao():
+    assert "answer" not in admission.LIMITES_ROTA
+    assert "answer" not in admission.CHAVE_ROTA
+
+
+def test_prefetch_acima_do_limite_e_negado_por_usuario(monkeypatch):
+    monkeypatch.setattr(admission, "_limite_usuario", LimiteUsuario(por_segundo=0, rajada=2, max_chaves=10))
+
+    assert [permitir_prefetch(1) for _ in range(3)] == [True, True, False]
+    assert permitir_prefetch(2)
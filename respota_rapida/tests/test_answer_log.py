@@ -0,0 +1,54 @@
+from app.services.answer_log import AnswerLog
+
+
+def resposta(i):
+    return {"match_id": 1, "question_id": i, "user_id": 7, "selected_option": "A",
+            "time_taken": 1.0, "is_correct": True}
+
+
+def test_descarregar_envia_tudo_e_avanca_o_checkpoint(tmp_path):
+    gravadas = []
+    log = AnswerLog(str(tmp_path / "answers.jsonl"), persistir=gravadas.extend)
+    for i in range(3):
+        log.registrar(resposta(i))
+
+    assert log.descarregar() == 3
+    assert [e["question_id"] for e in gravadas] == [0, 1, 2]
+    assert (tmp_path / "answers.jsonl.checkpoint").read_text() == "3"
+    log.parar()
+
+
+def test_recuperar_reenvia_so_o_que_nao_foi_persistido(tmp_path):
+    caminho = str(tmp_path / "answers.jsonl")
+    log = AnswerLog(caminho, persistir=lambda entradas: None)
+    log.registrar(resposta(0))
+    log.descarregar()
+    log.registrar(resposta(1))
+    log._arquivo.close()  # queda antes do próximo envio
+
+    gravadas = []
+    novo = AnswerLog(caminho, persistir=gravadas.extend)
+
+    assert novo.recuperar() == 1
+    assert [e["question_id"] for e in gravadas] == [1]
+    novo.parar()
+
+
+def test_falha_ao_persistir_mantem_as_pendentes(tmp_path):
+    tentativas = []
+
+    def persistir(entradas):
+        tentativas.append(len(entradas))
+        if len(tentativas) == 1:
+            raise ConnectionError("banco fora")
+
+    log = AnswerLog(str(tmp_path / "answers.jsonl"), persistir=persistir)
+    log.registrar(resposta(0))
+    try:
+        log.descarregar()
+    except ConnectionError:
+        pass
+
+    assert log.descarregar() == 1
+    assert tentativas == [1, 1]
+    log.parar()
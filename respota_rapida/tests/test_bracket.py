@@ -0,0 +1,115 @@
+import pytest
+
+from app.services.bracket import BYE, Chave, ordem_seeds, parear_suico, proxima_potencia_de_dois, rodadas_suico
+
+
+def test_ordem_seeds_separa_os_melhores_ate_a_final():
+    assert ordem_seeds(2) == [1, 2]
+    assert ordem_seeds(4) == [1, 4, 2, 3]
+    assert ordem_seeds(8) == [1, 8, 4, 5, 2, 7, 3, 6]
+
+
+def test_proxima_potencia_de_dois():
+    assert [proxima_potencia_de_dois(n) for n in (1, 2, 3, 4, 5, 9)] == [2, 2, 4, 4, 8, 16]
+
+
+def test_chave_completa_tem_todas_as_partidas_da_primeira_rodada_prontas():
+    chave = Chave.criar([101, 102, 103, 104])
+
+    assert chave.tamanho == 4
+    assert chave.total_rodadas == 2
+    assert chave.prontos() == [2, 3]
+    assert chave.filhos(2) == (101, 104)
+    assert chave.filhos(3) == (102, 103)
+    assert chave.rodada(2) == 1 and chave.rodada(1) == 2
+
+
+def test_byes_vao_para_os_melhores_seeds():
+    chave = Chave.criar([1, 2, 3, 4, 5])  # 5 jogadores em chave de 8: 3 byes
+
+    assert chave.tamanho == 8
+    folhas = list(chave.vencedores[8:16])
+    assert folhas.count(BYE) == 3
+    # Seeds 1, 2 e 3 avançam direto: 4 x 5 joga a primeira rodada e 2 x 3 já está pronta
+    assert {chave.vencedores[no] for no in (4, 6, 7)} == {1, 2, 3}
+    assert chave.prontos() == [3, 5]
+    assert chave.filhos(5) == (4, 5)
+    assert chave.filhos(3) == (2, 3)
+
+
+def test_registrar_vencedor_avanca_ate_o_campeao():
+    chave = Chave.criar([10, 20, 30, 40])
+
+    assert chave.registrar_vencedor(2, 10) is None  # o irmão ainda não terminou
+    assert chave.registrar_vencedor(3, 30) == 1     # final pronta
+    assert chave.campeao() is None
+    assert chave.registrar_vencedor(1, 30) is None
+    assert chave.campeao() == 30
+
+
+def test_registrar_vencedor_resolve_byes_no_caminho():
+    chave = Chave.criar([1, 2, 3])  # seed 1 tem bye
+
+    assert chave.prontos() == [3]
+    assert chave.registrar_vencedor(3, 2) == 1
+    assert chave.filhos(1) == (1, 2)
+
+
+def test_registrar_vencedor_rejeita_jogador_de_fora_e_repeticao():
+    chave = Chave.criar([1, 2, 3, 4])
+
+    with pytest.raises(ValueError):
+        chave.registrar_vencedor(2, 99)
+    chave.registrar_vencedor(2, 1)
+    with pytest.raises(ValueError):
+        chave.registrar_vencedor(2, 1)
+
+
+def test_serializar_e_carregar_preservam_a_chave():
+    chave = Chave.criar([7, 8, 9, 10, 11])
+    chave.partidas[5] = 1234
+    chave.registrar_vencedor(5, 11)
+
+    copia = Chave.carregar(chave.tamanho, *chave.serializar())
+
+    assert copia.vencedores == chave.vencedores
+    assert copia.partidas == chave.partidas
+    assert copia.pagina(1, 8) == chave.pagina(1, 8)
+
+
+def test_pagina_exporta_nos_internos():
+    chave = Chave.criar([1, 2, 3])
+    nos = chave.pagina(0, 100)
+
+    assert [n["node"] for n in nos] == [1, 2, 3]
+    assert nos[1]["bye"] is True and nos[1]["winner_id"] == 1
+    assert nos[2] == {
+        "node": 3, "round": 1, "tournament_match_id": None,
+        "player1_id": 2, "player2_id": 3, "winner_id": None, "bye": False
+    }
+
+
+def test_rodadas_suico():
+    assert [rodadas_suico(n) for n in (2, 3, 8, 9)] == [1, 2, 3, 4]
+
+
+def test_parear_suico_evita_revanche():
+    confrontos = {frozenset((1, 2))}
+    pares, bye = parear_suico([1, 2, 3, 4], confrontos, set())
+
+    assert bye is None
+    assert pares == [(1, 3), (2, 4)]
+
+
+def test_parear_suico_bye_para_o_pior_que_ainda_nao_folgou():
+    pares, bye = parear_suico([1, 2, 3, 4, 5], set(), {5})
+
+    assert bye == 4
+    assert pares == [(1, 2), (3, 5)]
+
+
+def test_parear_suico_repete_confronto_quando_nao_ha_alternativa():
+    confrontos = {frozenset((1, 2))}
+    pares, bye = parear_suico([1, 2], confrontos, set())
+
+    assert pares == [(1, 2)] and bye is None
@@ -0,0 +1,136 @@
+import pytest
+
+from app.services import llm_resilience
+from app.services.llm_resilience import ABERTO, FECHADO, MEIO_ABERTO, CircuitBreaker, gerar_pergunta_resiliente
+
+PERGUNTA = {"question": "?", "options": {"A": "a"}, "correct_option": "A", "tip": ""}
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", relogio)
+    monkeypatch.setattr(llm_resilience.time, "sleep", relogio.avancar)
+    return relogio
+
+
+@pytest.fixture
+def breaker(monkeypatch, relogio):
+    breaker = CircuitBreaker(limite_falhas=3, tempo_reset=30, nome="teste")
+    monkeypatch.setattr(llm_resilience, "breaker", breaker)
+    return breaker
+
+
+def test_abre_apos_o_limite_de_falhas(breaker):
+    for _ in range(2):
+        breaker.falha()
+    assert breaker.estado == FECHADO and breaker.permitir()
+
+    breaker.falha()
+    assert breaker.estado == ABERTO
+    assert not breaker.permitir()
+
+
+def test_meio_aberto_libera_uma_unica_chamada_de_teste(breaker, relogio):
+    for _ in range(3):
+        breaker.falha()
+    relogio.avancar(30)
+
+    assert breaker.permitir()
+    assert breaker.estado == MEIO_ABERTO
+    assert not breaker.permitir()
+
+
+def test_sucesso_no_meio_aberto_fecha(breaker, relogio):
+    for _ in range(3):
+        breaker.falha()
+    relogio.avancar(30)
+    breaker.permitir()
+
+    breaker.sucesso()
+    assert breaker.estado == FECHADO
+    assert breaker.permitir() and breaker.permitir()
+
+
+def test_falha_no_meio_aberto_reabre(breaker, relogio):
+    for _ in range(3):
+        breaker.falha()
+    relogio.avancar(30)
+    breaker.permitir()
+
+    breaker.falha()
+    assert breaker.estado == ABERTO
+    assert not breaker.permitir()
+
+
+def test_tentativas_limitadas_e_sucesso_na_ultima(breaker, monkeypatch):
+    chamadas = []
+
+    def solicitar(timeout, categoria, dificuldade):
+        chamadas.append(timeout)
+        if len(chamadas) <= llm_resilience.LLM_MAX_RETRIES:
+            raise TimeoutError("lento")
+        return PERGUNTA
+
+    monkeypatch.setattr(llm_resilience, "LLM_BREAKER_THRESHOLD", 100)
+    monkeypatch.setattr(llm_resilience, "solicitar_pergunta", solicitar)
+    breaker.limite_falhas = 100
+
+    assert gerar_pergunta_resiliente() == PERGUNTA
+    assert len(chamadas) == llm_resilience.LLM_MAX_RETRIES + 1
+    assert breaker.estado == FECHADO
+
+
+def test_orcamento_interrompe_as_tentativas(breaker, relogio, monkeypatch):
+    chamadas = []
+
+    def solicitar(timeout, categoria, dificuldade):
+        chamadas.append(timeout)
+        relogio.avancar(timeout)  # cada chamada estoura o próprio timeout
+        raise TimeoutError("lento")
+
+    monkeypatch.setattr(llm_resilience, "LLM_RETRY_BUDGET", 10)
+    monkeypatch.setattr(llm_resilience, "OPENAI_TIMEOUT", 8)
+    monkeypatch.setattr(llm_resilience, "LLM_MAX_RETRIES", 5)
+    monkeypatch.setattr(llm_resilience, "solicitar_pergunta", solicitar)
+    breaker.limite_falhas = 100
+
+    assert gerar_pergunta_resiliente() is None
+    # 8 s na primeira; a segunda só recebe o que sobra do orçamento
+    assert chamadas[0] == 8
+    assert sum(chamadas) <= 10 + 1e-9
+    assert len(chamadas) < llm_resilience.LLM_MAX_RETRIES + 1
+
+
+def test_orcamento_esgotado_nao_prende_o_disjuntor_meio_aberto(breaker, relogio, monkeypatch):
+    monkeypatch.setattr(llm_resilience, "LLM_RETRY_BUDGET", 0)
+    monkeypatch.setattr(llm_resilience, "solicitar_pergunta", lambda **_: PERGUNTA)
+    for _ in range(3):
+        breaker.falha()
+    relogio.avancar(30)
+
+    assert gerar_pergunta_resiliente() is None
+    # A vaga de teste continua livre para a próxima chamada
+    assert breaker.permitir()
+
+
+def test_disjuntor_aberto_rejeita_sem_chamar_a_api(breaker, monkeypatch):
+    def solicitar(**_):
+        raise AssertionError("não deveria chamar a API")
+
+    monkeypatch.setattr(llm_resilience, "solicitar_pergunta", solicitar)
+    for _ in range(3):
+        breaker.falha()
+
+    assert gerar_pergunta_resiliente() is None
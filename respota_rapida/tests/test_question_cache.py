@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from app.services import question_cache
+from app.services.question_cache import anexar_campos, incorporar, serializar_question_db
+
+
+class QuestionFalsa:
+    def __init__(self, id, options='{"A": "Paris", "B": "Roma"}'):
+        self.id = id
+        self.question_text = "Qual é a capital da França?"
+        self.options = options
+        self.tip = "Cidade luz"
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(question_cache, "orjson", None)
+    return request.param
+
+
+def test_resposta_de_empate_com_user_ids_inteiros(encoder):
+    # Mesmo formato montado por GET /result no empate: pontuacoes tem chaves int
+    pergunta = anexar_campos(serializar_question_db(QuestionFalsa(9001)), {"user_id": 7, "answer_token": "1.2.3.4.ab"})
+    corpo = incorporar(
+        {"pontuacoes": {7: 3, 9: 3}, "empate": True, "vencedores": [7, 9]},
+        {"perguntas_extra": b"[" + pergunta + b"]"}
+    )
+
+    dados = json.loads(corpo)
+    assert dados["pontuacoes"] == {"7": 3, "9": 3}
+    assert dados["perguntas_extra"][0]["question_id"] == 9001
+    assert dados["perguntas_extra"][0]["user_id"] == 7
+    assert dados["perguntas_extra"][0]["options"] == {"A": "Paris", "B": "Roma"}
+
+
+def test_payload_em_cache_e_reaproveitado_sem_decodificar(encoder):
+    primeiro = serializar_question_db(QuestionFalsa(9002))
+    # options inválido provaria um json.loads: com cache, não é lido
+    assert serializar_question_db(QuestionFalsa(9002, options="não é json")) is primeiro
+
+
+def test_anexar_e_incorporar_em_objetos_vazios(encoder):
+    assert json.loads(anexar_campos(b"{}", {"a": 1})) == {"a": 1}
+    assert json.loads(incorporar({}, {"x": b"[1]"})) == {"x": [1]}
+    assert incorporar({"a": 1}, {}) == question_cache.dumps({"a": 1})
@@ -0,0 +1,137 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.services.state_backend import MemoryBackend, RedisBackend
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import fake_redis_server  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def servidor_redis():
+    pytest.importorskip("redis")
+    servidor = fake_redis_server.iniciar()
+    yield servidor
+    servidor.shutdown()
+
+
+@pytest.fixture(params=["memoria", "redis"])
+def backend(request):
+    if request.param == "memoria":
+        return MemoryBackend()
+    servidor = request.getfixturevalue("servidor_redis")
+    # O stand-in é compartilhado entre os testes: cada teste usa chaves com o próprio nome
+    return RedisBackend(f"redis://127.0.0.1:{servidor.server_address[1]}/0")
+
+
+def test_fila_e_fifo_e_devolver_volta_para_o_inicio(backend, request):
+    fila = f"fila:{request.node.name}"
+    backend.entrar_fila(fila, "1")
+    backend.entrar_fila(fila, "2")
+
+    assert backend.sair_fila(fila) == "1"
+    backend.devolver_fila(fila, "1")
+    assert backend.sair_fila(fila) == "1"
+    assert backend.sair_fila(fila) == "2"
+    assert backend.sair_fila(fila) is None
+
+
+def test_remover_fila(backend, request):
+    fila = f"fila:{request.node.name}"
+    for valor in ("1", "2", "3"):
+        backend.entrar_fila(fila, valor)
+    backend.remover_fila(fila, "2")
+
+    assert [backend.sair_fila(fila) for _ in range(3)] == ["1", "3", None]
+
+
+def test_sair_fila_concorrente_entrega_cada_partida_uma_vez(backend, request):
+    fila = f"fila:{request.node.name}"
+    for i in range(200):
+        backend.entrar_fila(fila, str(i))
+
+    retirados, lock = [], threading.Lock()
+
+    def consumir():
+        while (valor := backend.sair_fila(fila)) is not None:
+            with lock:
+                retirados.append(valor)
+
+    threads = [threading.Thread(target=consumir) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(retirados, key=int) == [str(i) for i in range(200)]
+
+
+def test_marcar_so_o_primeiro_vence(backend, request):
+    chave = f"answer:{request.node.name}"
+    assert backend.marcar(chave, "10") is True
+    assert backend.marcar(chave, "20") is False
+    assert backend.ler(chave) == "10"
+
+    backend.apagar(chave)
+    assert backend.ler(chave) is None
+    assert backend.marcar(chave, "20") is True
+
+
+def test_incrementar(backend, request):
+    chave = f"contador:{request.node.name}"
+    assert backend.incrementar(chave) == 1
+    assert backend.incrementar(chave, 5) == 6
+
+
+def test_publicar_e_assinar(backend, request):
+    canal = f"match:{request.node.name}"
+    recebidas, pronto = [], threading.Event()
+
+    def ouvir():
+        for mensagem in backend.assinar(canal):
+            recebidas.append(mensagem)
+            pronto.set()
+            break
+
+    ouvinte = threading.Thread(target=ouvir, daemon=True)
+    ouvinte.start()
+
+    # A assinatura é assíncrona: publica até alguém receber
+    while not pronto.wait(0.05):
+        backend.publicar(canal, '{"evento": "pronta"}')
+    ouvinte.join(1)
+
+    assert recebidas[0] == '{"evento": "pronta"}'
+
+
+def test_memoria_varre_marcacoes_vencidas(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr("app.services.state_backend.time.monotonic", lambda: agora[0])
+    backend = MemoryBackend()
+    for i in range(100):
+        backend.marcar(f"answer:{i}", "1", ttl=10)
+    backend.marcar("permanente", "1", ttl=None)
+
+    agora[0] += 11
+    backend.marcar("answer:nova", "1", ttl=10)
+
+    assert set(backend._chaves) == {"permanente", "answer:nova"}
+    assert len(backend._expiracoes) == 1
+
+
+def test_memoria_varredura_nao_apaga_chave_regravada(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr("app.services.state_backend.time.monotonic", lambda: agora[0])
+    backend = MemoryBackend()
+    backend.marcar("answer:1", "10", ttl=10)
+    backend.apagar("answer:1")
+    agora[0] += 5
+    backend.marcar("answer:1", "20", ttl=10)
+
+    agora[0] += 6  # vence a primeira marcação, não a segunda
+    backend.marcar("outra", "1", ttl=10)
+
+    assert backend.ler("answer:1") == "20"
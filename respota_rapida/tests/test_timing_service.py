@@ -0,0 +1,34 @@
+import pytest
+
+from app.services import timing_service
+from app.services.timing_service import emitir_token, marcar_envio, medir_tempo
+
+
+def test_token_valido_traz_o_limite_assinado():
+    token = emitir_token(1, 2, 12.5)
+    tempo, limite, fonte = medir_tempo(1, 2, token=token)
+
+    assert limite == 12.5
+    assert fonte == "token"
+    assert 0 <= tempo < 5
+
+
+@pytest.mark.parametrize("token", ["1.2.3.4.é", "1.2.3.4.abc", "lixo", "1.2.3.4.5.6"])
+def test_token_malformado_vira_value_error(token):
+    with pytest.raises(ValueError):
+        medir_tempo(1, 2, token=token)
+
+
+def test_token_de_outra_pergunta_e_recusado():
+    with pytest.raises(ValueError):
+        medir_tempo(1, 3, token=emitir_token(1, 2, 10))
+
+
+def test_token_invalido_nao_consome_o_registro_monotonico():
+    marcar_envio(5, 6)
+    with pytest.raises(ValueError):
+        medir_tempo(5, 6, token="5.6.0.10000.assinatura-errada")
+
+    _, _, fonte = medir_tempo(5, 6, token=emitir_token(5, 6, 10))
+    assert fonte == "monotonic"
+    assert (5, 6) not in timing_service._envios